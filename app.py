@@ -1,23 +1,183 @@
-from flask import Flask, request, jsonify
-from combined_processor import process_email
+from flask import Flask, Response, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+from combined_processor import process_email, PROCESSOR_REGISTRY, RESULT_CACHE
+from translation_cache import get_translation_cache
+from batch_processor import parse_batch_body, process_batch, BATCH_MAX_ITEMS
 from celery import Celery
+from celery.result import AsyncResult
+from tasks import enqueue_process_email, BULK_QUEUE
+from metrics import observe_request, observe_stage, render_metrics, timed_stage, current_processor
+import json_codec
 import os
+import time
 import logging
+from logging_config import configure_logging
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
+configure_logging()
 logger = logging.getLogger(__name__)
+# One line per request with metadata only; bodies are never logged
+access_logger = logging.getLogger('newsletter.access')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """request.json and jsonify through json_codec (orjson when installed). Debug mode keeps pretty output."""
+
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s) if not kwargs else super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(json_codec.dumps(obj, sort_keys=self.sort_keys) + b"\n", mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+# Bodies over this are rejected with 413 before they're read; process_email also caps HTML size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_PAYLOAD_BYTES', 32 * 1024 * 1024))
 
 # Celery configuration
 redis_url = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379')
-celery = Celery('tasks', broker=redis_url, backend=redis_url)
+# CELERY_TASK_ALWAYS_EAGER=1 runs jobs inline, e.g. for local testing without a worker. Eager
+# results are still stored, so by default they go to an in-process backend rather than Redis;
+# job status is then only visible to the process that ran the job (run with one worker)
+task_always_eager = os.environ.get('CELERY_TASK_ALWAYS_EAGER', '0') == '1'
+result_backend = os.environ.get('CELERY_RESULT_BACKEND', 'cache+memory://' if task_always_eager else redis_url)
+# include: modules whose tasks the worker registers at startup
+celery = Celery('tasks', broker=redis_url, backend=result_backend, include=['tasks', 'translator'])
 celery.conf.update(
     task_time_limit=600,  # 10 minutes
     task_soft_time_limit=540,  # 9 minutes
+    task_track_started=True,
+    result_expires=86400,
+    task_default_queue=BULK_QUEUE,
+    # Lets small newsletters jump ahead of queued digests (0 = highest priority)
+    broker_transport_options={'priority_steps': list(range(10)), 'sep': ':', 'queue_order_strategy': 'priority'},
+    task_always_eager=task_always_eager,
+    task_store_eager_result=True,
 )
 
+def warm_up():
+    """
+    Do first-use work ahead of traffic: load the config, compile the routing index, ad
+    matcher and category model, and exercise the parser. Run once in the gunicorn master with --preload
+    (WARM_UP=1) so every forked worker starts warm.
+    """
+    from newsletter_utils import get_ad_matcher
+    from post_processing import get_pipelines
+    from html_parsing import parse_html
+    from categorizer import get_category_model
+
+    start = time.perf_counter()
+    PROCESSOR_REGISTRY.compile()
+    get_ad_matcher()
+    get_pipelines()
+    get_category_model()
+    parse_html('<html><body><p>warm up</p></body></html>')
+    logger.info("Warm-up finished in %.3fs", time.perf_counter() - start)
+
+if os.environ.get('WARM_UP', '0') == '1':
+    warm_up()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by route pattern, not raw path, so /jobs/<job_id> stays one series
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    seconds = time.perf_counter() - g.get('request_started', time.perf_counter())
+    observe_request(endpoint, request.method, response.status_code, seconds, request.content_length)
+
+    if access_logger.isEnabledFor(logging.INFO):
+        fields = {
+            "method": request.method,
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "duration_ms": round(seconds * 1000, 2),
+            "request_bytes": request.content_length,
+            **g.get('email_fields', {}),
+        }
+        access_logger.info("%s %s %s %.1fms", request.method, endpoint, response.status_code, seconds * 1000, extra=fields)
+    return response
+
+def remember_email(data):
+    """Keep the email's metadata (not its body) for the access log line."""
+    metadata = data.get('metadata', {}) if isinstance(data, dict) else {}
+    g.email_fields = {
+        "sender": metadata.get('sender', ''),
+        "subject": metadata.get('subject', ''),
+        "html_bytes": len(metadata.get('content', {}).get('html', '')) if isinstance(metadata.get('content'), dict) else 0,
+    }
+
+@app.errorhandler(413)
+def payload_too_large(e):
+    return jsonify({"error": f"Payload too large (max {app.config['MAX_CONTENT_LENGTH']} bytes)"}), 413
+
+def wants_stream() -> bool:
+    return (request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+            or request.accept_mimetypes.best == 'application/x-ndjson')
+
+def ndjson_lines(result):
+    """
+    An email result as NDJSON: its metadata, pipeline stats and block_count on the first
+    line, then one content block per line. A batch result is one item per line, then its stats.
+    """
+    if isinstance(result.get('results'), list):
+        yield from result['results']
+        yield {"stats": result.get('stats', {})}
+        return
+    blocks = result.get('content', {}).get('content_blocks', [])
+    head = {key: value for key, value in result.items() if key != 'content'}
+    head['content'] = {key: value for key, value in result.get('content', {}).items() if key != 'content_blocks'}
+    head['block_count'] = len(blocks)
+    yield head
+    yield from blocks
+
+def stream_response(result, status_code):
+    """Encode and send one line at a time, so a large result is never held as one encoded body."""
+    processor = current_processor()
+
+    def generate():
+        seconds = 0.0
+        for line in ndjson_lines(result):
+            start = time.perf_counter()
+            encoded = json_codec.dumps(line) + b"\n"
+            seconds += time.perf_counter() - start
+            yield encoded
+        observe_stage('serialize', seconds, processor)
+
+    return Response(generate(), status=status_code, mimetype='application/x-ndjson')
+
+def respond(result, status_code):
+    """
+    Serialize the processing result, timing serialization as its own stage.
+    Successful results are streamed as NDJSON when the client asks (?stream=1 or Accept: application/x-ndjson).
+    """
+    if status_code == 200 and isinstance(result, dict) and wants_stream():
+        return stream_response(result, status_code)
+    with timed_stage('serialize'):
+        response = jsonify(result)
+    return response, status_code
+
+def is_async_request() -> bool:
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def handle_email_request(data, translate_to=None):
+    remember_email(data)
+    if is_async_request():
+        try:
+            job_id = enqueue_process_email(data, translate_to or request.args.get('translate_to'))
+        except Exception as e:
+            logger.exception("Failed to queue email for async processing")
+            return jsonify({"error": f"Unable to queue job: {str(e)}"}), 503
+        return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+    result, status_code = process_email(data)
+    g.email_fields["processor"] = current_processor()
+    return respond(result, status_code)
+
 @app.route('/')
 def home():
     logger.debug("Home route accessed")
@@ -25,17 +185,104 @@ def home():
 
 @app.route('/process-newsletter', methods=['POST'])
 def process_newsletter():
-    logger.debug(f"Received request data: {request.json}")
     data = request.json
-    result, status_code = process_email(data)
-    return jsonify(result), status_code
+    return handle_email_request(data)
 
 @app.route('/process_email', methods=['POST'])
 def process_email_route():
-    logger.debug(f"Received request data: {request.json}")
     data = request.json
+    return handle_email_request(data)
+
+@app.route('/translate-newsletter', methods=['POST'])
+def translate_newsletter_route():
+    data = request.json
+    target_language = request.args.get('target_language', 'he')
+
+    if is_async_request():
+        return handle_email_request(data, translate_to=target_language)
+
+    from translator import translate_newsletter_blocks, get_api_key
+    try:
+        get_api_key()
+    except EnvironmentError as e:
+        return jsonify({"error": str(e)}), 503
+
+    remember_email(data)
     result, status_code = process_email(data)
-    return jsonify(result), status_code
+    g.email_fields["processor"] = current_processor()
+    if status_code != 200:
+        return respond(result, status_code)
+
+    _, stats = translate_newsletter_blocks(result['content']['content_blocks'], target_language)
+    result['translation'] = stats
+    logger.info("Translated %s blocks in %ss (%s tasks)", stats['blocks'], stats['seconds'], stats['tasks'])
+    return respond(result, 200)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    async_result = AsyncResult(job_id, app=celery)
+    response = {"job_id": job_id, "state": async_result.state}
+
+    if async_result.successful():
+        response["status"] = async_result.result["status"]
+        response["result"] = async_result.result["result"]
+    elif async_result.failed():
+        response["error"] = str(async_result.result)
+
+    return jsonify(response), 200
+
+@app.route('/process-batch', methods=['POST'])
+def process_batch_route():
+    try:
+        items = parse_batch_body(request.get_data(), request.content_type or '')
+    except ValueError as e:
+        return jsonify({"error": f"Invalid batch body: {str(e)}"}), 400
+
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Batch too large: {len(items)} items (max {BATCH_MAX_ITEMS})"}), 413
+
+    logger.debug("Received batch of %d emails", len(items))
+    return respond(process_batch(items), 200)
+
+@app.route('/determine-processor', methods=['GET'])
+def determine_processor_route():
+    sender_email = request.args.get('sender', '')
+    sender_name = request.args.get('sender_name', '')
+    processor, route = PROCESSOR_REGISTRY.resolve(sender_email, sender_name)
+    return jsonify({
+        "sender_email": sender_email,
+        "sender_name": sender_name,
+        "processor": processor,
+        "matched_route": route,
+    }), 200
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(RESULT_CACHE.report()), 200
+
+@app.route('/translation-cache-stats', methods=['GET'])
+def translation_cache_stats():
+    return jsonify(get_translation_cache().report()), 200
+
+@app.route('/dedup-stats', methods=['GET'])
+def dedup_stats():
+    from dedup_index import get_dedup_index
+    return jsonify(get_dedup_index().report()), 200
+
+@app.route('/translation-stats', methods=['GET'])
+def translation_stats():
+    from translator import translation_report
+    return jsonify(translation_report()), 200
+
+@app.route('/selector-stats', methods=['GET'])
+def selector_stats():
+    from selector_index import selector_report
+    return jsonify(selector_report()), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
 
 @app.route('/healthz', methods=['GET'])
 def health_check():
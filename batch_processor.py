@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Dict, NamedTuple, Tuple, Optional
+
+import json_codec
+from combined_processor import process_email
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', os.cpu_count() or 1))
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 1000))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+class InvalidItem(NamedTuple):
+    """An NDJSON line that isn't valid JSON; it gets its own 400 result instead of failing the batch."""
+    error: str
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the per-worker process pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+        return _executor
+
+def reset_executor(executor: ProcessPoolExecutor) -> None:
+    """
+    Shut down a broken pool so the next batch starts a fresh one. Only replaces the
+    pool if it is still the one that failed: another request thread may already have
+    reset it and be submitting to its replacement.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _parse_line(line: str) -> Any:
+    try:
+        return json_codec.loads(line)
+    except ValueError as e:
+        return InvalidItem(f"Invalid JSON: {str(e)}")
+
+def parse_batch_body(raw_body: bytes, content_type: str = '') -> List[Any]:
+    """
+    Parse a batch request body into a list of email payloads.
+    Accepts either a JSON array or NDJSON (one email payload per line). An NDJSON line
+    that isn't valid JSON becomes an InvalidItem, processed as a 400 for that item alone.
+    """
+    text = raw_body.decode('utf-8') if isinstance(raw_body, bytes) else raw_body
+    stripped = text.lstrip()
+    if not stripped:
+        return []
+
+    if 'ndjson' not in content_type and stripped.startswith('['):
+        items = json_codec.loads(stripped)
+        if not isinstance(items, list):
+            raise ValueError("Batch body must be a JSON array")
+        return items
+
+    return [_parse_line(line) for line in text.splitlines() if line.strip()]
+
+def _process_item(data) -> Tuple[Dict, int]:
+    if isinstance(data, InvalidItem):
+        return {"error": data.error}, 400
+    if not isinstance(data, dict):
+        return {"error": "Invalid JSON structure"}, 400
+    return process_email(data)
+
+def process_batch(items: List[Dict], max_workers: Optional[int] = None) -> Dict:
+    """
+    Process many emails, preserving input order in the results.
+    Each item gets its own status code so one bad email doesn't fail the batch.
+    """
+    start = time.perf_counter()
+    workers = BATCH_MAX_WORKERS if max_workers is None else max_workers
+
+    if workers > 1 and len(items) > 1:
+        outcomes = []
+        executor = get_executor()
+        try:
+            for outcome in executor.map(_process_item, items, chunksize=max(1, len(items) // (workers * 4))):
+                outcomes.append(outcome)
+        except Exception as e:
+            # Don't retry in this process: the email that killed a pool worker would take down the web worker too
+            logger.exception("Process pool failed after %d of %d batch items", len(outcomes), len(items))
+            reset_executor(executor)
+            error = {"error": f"Batch worker failed: {type(e).__name__}"}
+            outcomes.extend((error, 500) for _ in range(len(items) - len(outcomes)))
+    else:
+        outcomes = [_process_item(item) for item in items]
+
+    results = []
+    succeeded = 0
+    for index, (result, status_code) in enumerate(outcomes):
+        if status_code == 200:
+            succeeded += 1
+        results.append({"index": index, "status": status_code, "result": result})
+
+    elapsed = time.perf_counter() - start
+    return {
+        "results": results,
+        "stats": {
+            "count": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "elapsed_seconds": round(elapsed, 4),
+            "emails_per_second": round(len(items) / elapsed, 2) if elapsed > 0 else None,
+        }
+    }
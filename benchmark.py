@@ -0,0 +1,935 @@
+"""
+Benchmarks for the newsletter processors. These only measure; the tests in tests/ check
+that each optimized path gives the same output as the one it replaced.
+
+Usage:
+    python benchmark.py processors [--stories N ...] [--sizes 10KB 5MB] [--backend NAME] [--repeat N]
+                                   [--fixtures DIR] [--output FILE]
+    python benchmark.py compare BASELINE.json CURRENT.json [--threshold 1.2]
+    python benchmark.py parsers [--stories N] [--repeat N] [--fixtures DIR]
+    python benchmark.py regions [--stories N] [--repeat N] [--fixtures DIR]
+    python benchmark.py ads [--stories N] [--repeat N] [--fixtures DIR]
+    python benchmark.py translation [--stories N] [--latency-ms N]
+    python benchmark.py startup [--repeat N] [--module NAME]
+    python benchmark.py logging [--stories N] [--requests N]
+    python benchmark.py dedup [--entries N] [--lookups N]
+    python benchmark.py memory [--sizes 100KB 1MB 5MB] [--source NAME] [--clean]
+    python benchmark.py categorize [--batch-sizes 1 100 10000]
+    python benchmark.py summarize [--words 1000 10000 50000] [--repeat N]
+    python benchmark.py text [--stories N ...] [--repeat N]
+    python benchmark.py selectors [--stories N ...] [--repeat N]
+    python benchmark.py serialization [--blocks 10 100 1000 5000] [--repeat N]
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import tracemalloc
+from typing import Dict, List
+
+import dedup_index
+import html_parsing
+import newsletter_utils
+import translation_cache
+from combined_processor import process_email, PROCESSOR_REGISTRY, RESULT_CACHE
+from sample_corpus import SOURCES, build_email, build_email_of_size, parse_size
+
+def _time_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def _peak_memory(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _load_fixtures(directory: str) -> Dict[str, Dict]:
+    """Load saved request payloads (*.json) keyed by file name."""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, 'r') as f:
+            fixtures[os.path.basename(path)] = json.load(f)
+    return fixtures
+
+def _emails(stories: int, fixtures_dir: str = None) -> Dict[str, Dict]:
+    emails = {source: build_email(source, stories) for source in SOURCES}
+    if fixtures_dir:
+        emails.update(_load_fixtures(fixtures_dir))
+    return emails
+
+def _percentile(samples: List[float], percent: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+def _processor_cases(stories_list: List[int], sizes: List[str], fixtures_dir: str = None):
+    for source in SOURCES:
+        for stories in stories_list:
+            yield source, f"{stories} stories", build_email(source, stories)
+        for size in sizes:
+            yield source, size, build_email_of_size(source, parse_size(size))
+    if fixtures_dir:
+        for name, email in _load_fixtures(fixtures_dir).items():
+            yield name, 'fixture', email
+
+def bench_processors(stories_list: List[int], sizes: List[str], backends: List[str], repeat: int,
+                     fixtures_dir: str = None) -> List[Dict]:
+    """Every processor over generated (and saved) emails: latency percentiles, throughput and peak memory."""
+    report = []
+    original_backend = html_parsing.PARSER_BACKEND
+    try:
+        for source, case, email in _processor_cases(stories_list, sizes, fixtures_dir):
+            metadata = email['metadata']
+            processor, _ = PROCESSOR_REGISTRY.resolve(metadata.get('sender', '').lower(), metadata.get('Sender name', '').lower())
+            html_bytes = len(metadata['content']['html'])
+            for backend in backends:
+                html_parsing.PARSER_BACKEND = backend
+                result, status_code = process_email(email)
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    process_email(email)
+                    samples.append(time.perf_counter() - start)
+                total = sum(samples)
+                report.append({
+                    "source": source,
+                    "case": case,
+                    "processor": processor,
+                    "backend": backend,
+                    "html_bytes": html_bytes,
+                    "status": status_code,
+                    "blocks": len(result.get('content', {}).get('content_blocks', [])),
+                    "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+                    "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+                    "emails_per_second": round(repeat / total, 2),
+                    "mb_per_second": round(html_bytes * repeat / total / (1024 * 1024), 2),
+                    "peak_memory_kb": round(_peak_memory(lambda: process_email(email)) / 1024, 1),
+                })
+    finally:
+        html_parsing.PARSER_BACKEND = original_backend
+
+    return report
+
+def benchmark_metadata() -> Dict:
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+def compare_runs(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """Match rows of two saved processor runs and flag p50/p95 slowdowns beyond threshold."""
+    def keyed(run):
+        return {(row['source'], row['case'], row['backend']): row for row in run['results']}
+
+    baseline_rows, current_rows = keyed(baseline), keyed(current)
+    report = []
+    for key, row in current_rows.items():
+        before = baseline_rows.get(key)
+        if before is None:
+            continue
+        p50_ratio = round(row['p50_ms'] / before['p50_ms'], 3) if before['p50_ms'] else None
+        p95_ratio = round(row['p95_ms'] / before['p95_ms'], 3) if before['p95_ms'] else None
+        report.append({
+            "source": key[0],
+            "case": key[1],
+            "backend": key[2],
+            "baseline_p50_ms": before['p50_ms'],
+            "current_p50_ms": row['p50_ms'],
+            "p50_ratio": p50_ratio,
+            "p95_ratio": p95_ratio,
+            "peak_memory_ratio": round(row['peak_memory_kb'] / before['peak_memory_kb'], 3) if before['peak_memory_kb'] else None,
+            "regression": bool(p50_ratio and p50_ratio > threshold),
+        })
+    return report
+
+def bench_parsers(stories: int, repeat: int, fixtures_dir: str = None) -> List[Dict]:
+    """Time per email with html.parser and with lxml (tests/test_html_parsing.py checks they agree)."""
+    emails = _emails(stories, fixtures_dir)
+
+    report = []
+    original_backend = html_parsing.PARSER_BACKEND
+    try:
+        for name, email in emails.items():
+            timings, blocks = {}, 0
+            for backend in ('html.parser', 'lxml'):
+                html_parsing.PARSER_BACKEND = backend
+                result, _ = process_email(email)
+                blocks = len(result.get('content', {}).get('content_blocks', []))
+                timings[backend] = _time_call(lambda: process_email(email), repeat)
+
+            report.append({
+                "source": name,
+                "html_bytes": len(email['metadata']['content']['html']),
+                "blocks": blocks,
+                "html_parser_ms": round(timings['html.parser'] * 1000, 3),
+                "lxml_ms": round(timings['lxml'] * 1000, 3),
+                "speedup": round(timings['html.parser'] / timings['lxml'], 2) if timings['lxml'] else None,
+            })
+    finally:
+        html_parsing.PARSER_BACKEND = original_backend
+
+    return report
+
+def bench_regions(stories: int, repeat: int, fixtures_dir: str = None) -> List[Dict]:
+    """Full parses vs per-processor parse regions: time and peak memory (tests/test_html_parsing.py checks they agree)."""
+    emails = _emails(stories, fixtures_dir)
+
+    report = []
+    original_setting = html_parsing.PARTIAL_PARSING
+    try:
+        for name, email in emails.items():
+            timings, peaks = {}, {}
+            for mode, partial in (('full', False), ('partial', True)):
+                html_parsing.PARTIAL_PARSING = partial
+                timings[mode] = _time_call(lambda: process_email(email), repeat)
+                peaks[mode] = _peak_memory(lambda: process_email(email))
+
+            report.append({
+                "source": name,
+                "html_bytes": len(email['metadata']['content']['html']),
+                "full_ms": round(timings['full'] * 1000, 3),
+                "partial_ms": round(timings['partial'] * 1000, 3),
+                "full_peak_kb": round(peaks['full'] / 1024, 1),
+                "partial_peak_kb": round(peaks['partial'] / 1024, 1),
+            })
+    finally:
+        html_parsing.PARTIAL_PARSING = original_setting
+
+    return report
+
+def _legacy_is_advertisement(content_block) -> bool:
+    """The per-keyword, per-pattern scan is_advertisement used before AdMatcher (with its whole-word, title-or-short-body rule)."""
+    def scan(text):
+        for keyword in newsletter_utils.AD_KEYWORDS:
+            if re.search(rf'\b{re.escape(keyword.lower())}\b', text):
+                return True
+        return any(re.search(pattern, text, re.IGNORECASE) for pattern in newsletter_utils.PROMO_PATTERNS)
+
+    body = content_block.get('body_text', '')
+    if scan(content_block.get('title', '').lower()):
+        return True
+    return len(body.split()) <= newsletter_utils.AD_MAX_BODY_WORDS and scan(body.lower())
+
+def _ad_corpus(stories: int, fixtures_dir: str = None) -> List[Dict]:
+    blocks = []
+    for email in _emails(stories, fixtures_dir).values():
+        result, status_code = process_email(email)
+        if status_code == 200:
+            blocks.extend(result['content']['content_blocks'])
+    blocks.extend([
+        {"title": "Sponsored by Acme", "body_text": "Get 20% off your first order."},
+        {"title": "Feeling stuck?", "body_text": "Answer a few questions and connect with licensed therapists."},
+        {"title": "Save the date", "body_text": "Our virtual event returns next month. RSVP today."},
+    ])
+    return blocks
+
+def bench_ads(stories: int, repeat: int, fixtures_dir: str = None) -> List[Dict]:
+    """The legacy ad scan vs the compiled AdMatcher over extracted blocks (tests/test_ads.py checks they agree)."""
+    blocks = _ad_corpus(stories, fixtures_dir)
+    compiled = [newsletter_utils.is_advertisement(block) for block in blocks]
+
+    legacy_time = _time_call(lambda: [_legacy_is_advertisement(block) for block in blocks], repeat)
+    compiled_time = _time_call(lambda: [newsletter_utils.is_advertisement(block) for block in blocks], repeat)
+
+    keyword_hits = {}
+    for block in blocks:
+        for keyword in newsletter_utils.advertisement_hits(block)['keywords']:
+            keyword_hits[keyword] = keyword_hits.get(keyword, 0) + 1
+
+    return [{
+        "blocks": len(blocks),
+        "body_chars": sum(len(block.get('body_text', '')) for block in blocks),
+        "ads_flagged": sum(compiled),
+        "legacy_us_per_block": round(legacy_time / len(blocks) * 1e6, 2),
+        "compiled_us_per_block": round(compiled_time / len(blocks) * 1e6, 2),
+        "speedup": round(legacy_time / compiled_time, 2) if compiled_time else None,
+        "keyword_hits": keyword_hits,
+    }]
+
+class _StubTranslateHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Translate v2 endpoint: echoes each q with a language prefix."""
+    latency = 0.0
+    requests_served = 0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        time.sleep(self.latency)
+        type(self).requests_served += 1
+        target = form.get('target', ['he'])[0]
+        body = json.dumps({"data": {"translations": [
+            {"translatedText": f"[{target}] {q}"} for q in form.get('q', [])
+        ]}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_translate_server(latency: float = 0.0):
+    """Start the stub translation server on a free local port; returns (server, url)."""
+    _StubTranslateHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubTranslateHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/language/translate/v2"
+
+def bench_translation(stories: int, latency_ms: float) -> List[Dict]:
+    """Per-field translation requests vs batched requests per newsletter, against a local stub server."""
+    os.environ.setdefault('GOOGLE_TRANSLATE_API_KEY', 'benchmark')
+    import translator
+
+    server, url = start_stub_translate_server(latency_ms / 1000)
+    translator.TRANSLATE_URL = url
+    fields = ('title', 'body_text')
+
+    def per_field(blocks):
+        for block in blocks:
+            for field in fields:
+                if block.get(field):
+                    block[f'translated_{field}'] = translator.translate_text(block[field])
+
+    def batched(blocks):
+        translator.translate_content_blocks(blocks, fields=fields)
+
+    report = []
+    try:
+        for name, email in _emails(stories).items():
+            result, status_code = process_email(email)
+            if status_code != 200:
+                continue
+            row = {"source": name, "blocks": len(result['content']['content_blocks'])}
+            for mode, translate in (('per_field', per_field), ('batched', batched)):
+                translation_cache._translation_cache = translation_cache.TranslationCache(None)
+                blocks = json.loads(json.dumps(result['content']['content_blocks']))
+                served_before = _StubTranslateHandler.requests_served
+                start = time.perf_counter()
+                translate(blocks)
+                row[f"{mode}_requests"] = _StubTranslateHandler.requests_served - served_before
+                row[f"{mode}_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            report.append(row)
+    finally:
+        server.shutdown()
+        translation_cache._translation_cache = None
+
+    return report
+
+_STARTUP_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+import_seconds = time.perf_counter() - start
+warm_up_seconds = None
+if {warm_up} and hasattr({module}, 'warm_up'):
+    start = time.perf_counter()
+    {module}.warm_up()
+    warm_up_seconds = time.perf_counter() - start
+print(json.dumps({{
+    "import_seconds": import_seconds,
+    "warm_up_seconds": warm_up_seconds,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules_loaded": len(sys.modules),
+}}))
+"""
+
+def bench_startup(repeat: int, modules: List[str]) -> List[Dict]:
+    """Cold import time and RSS of a fresh interpreter per module, as a gunicorn worker would pay it."""
+    report = []
+    for module in modules:
+        for warm_up in (False, True):
+            if warm_up and module != 'app':
+                continue
+            runs = []
+            for _ in range(repeat):
+                output = subprocess.run(
+                    [sys.executable, '-c', _STARTUP_PROBE.format(module=module, warm_up=warm_up)],
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            report.append({
+                "module": module,
+                "warm_up": warm_up,
+                "import_ms_median": round(statistics.median(run['import_seconds'] for run in runs) * 1000, 1),
+                "warm_up_ms_median": round(statistics.median(run['warm_up_seconds'] for run in runs) * 1000, 1) if warm_up else None,
+                "max_rss_mb_median": round(statistics.median(run['max_rss_kb'] for run in runs) / 1024, 1),
+                "modules_loaded": runs[-1]['modules_loaded'],
+            })
+    return report
+
+_LOGGING_PROBE = """
+import json, logging, sys, time
+import app
+from combined_processor import RESULT_CACHE
+from sample_corpus import SOURCES, build_email
+RESULT_CACHE.enabled = False
+
+if {legacy_bodies}:
+    # What every request did before: format and write the whole payload at DEBUG
+    @app.app.before_request
+    def log_body():
+        app.logger.debug(f"Received request data: {{app.request.json}}")
+
+client = app.app.test_client()
+emails = [build_email(source, {stories}, seed=1) for source in SOURCES]
+for email in emails:
+    client.post('/process_email', json=email)
+
+start = time.perf_counter()
+for i in range({requests}):
+    client.post('/process_email', json=emails[i % len(emails)])
+seconds = time.perf_counter() - start
+logging.shutdown()
+print(json.dumps({{"seconds": seconds}}))
+"""
+
+LOGGING_MODES = {
+    "legacy_debug": ({"LOG_LEVEL": "DEBUG", "LOG_FORMAT": "text"}, True),
+    "debug": ({"LOG_LEVEL": "DEBUG", "LOG_FORMAT": "text"}, False),
+    "default": ({}, False),
+    "default_queued": ({"LOG_QUEUE": "1"}, False),
+    "default_sampled": ({"LOG_SAMPLE_RATE": "0.1"}, False),
+}
+
+def bench_logging(stories: int, requests: int) -> List[Dict]:
+    """Request throughput through the Flask app per logging mode, logs written to a real file."""
+    report = []
+    for mode, (env, legacy_bodies) in LOGGING_MODES.items():
+        probe = _LOGGING_PROBE.format(legacy_bodies=legacy_bodies, stories=stories, requests=requests)
+        child_env = {key: value for key, value in os.environ.items() if not key.startswith('LOG_')}
+        with tempfile.TemporaryFile() as log_file:
+            output = subprocess.run(
+                [sys.executable, '-c', probe],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env={**child_env, **env},
+                stdout=subprocess.PIPE, stderr=log_file, text=True, check=True,
+            ).stdout
+            log_bytes = log_file.tell()
+        seconds = json.loads(output.strip().splitlines()[-1])['seconds']
+        report.append({
+            "mode": mode,
+            "requests": requests,
+            "requests_per_second": round(requests / seconds, 1),
+            "log_bytes_per_request": round(log_bytes / (requests + len(SOURCES))),
+        })
+    return report
+
+def bench_dedup(entries: int, lookups: int) -> List[Dict]:
+    """Cross-newsletter dedup lookup latency (SimHash + index probe) against a pre-filled in-memory index."""
+    import random
+    rng = random.Random(0)
+    now = time.time()
+    index = dedup_index.DedupIndex(store=None)
+    for i in range(entries):
+        index._add({
+            "key": f"filler-{i}", "email_id": f"<filler-{i // 20}>", "source": 'generic', "title": '',
+            "link": f"//example.com/story/{i}", "fingerprint": rng.getrandbits(64), "seen_at": now,
+        })
+
+    blocks = []
+    for source in SOURCES:
+        result, _ = process_email(build_email(source, 20, seed=7))
+        blocks.extend(result['content']['content_blocks'])
+    context = {"email_id": '<first>', "processor": 'benchmark'}
+    for block in blocks:
+        index.check(block, context)
+
+    # Same stories arriving in another newsletter: links stripped so only SimHash can match
+    report = []
+    for case, candidates in (("link", blocks), ("near_duplicate", [{**block, "link": ''} for block in blocks])):
+        samples, flagged = [], 0
+        context = {"email_id": f'<second-{case}>', "processor": 'benchmark'}
+        for i in range(lookups):
+            start = time.perf_counter()
+            first = index.check(candidates[i % len(candidates)], context)
+            samples.append(time.perf_counter() - start)
+            flagged += first is not None
+        report.append({
+            "case": case,
+            "indexed_entries": len(index.entries),
+            "lookups": lookups,
+            "flagged_ratio": round(flagged / lookups, 3),
+            "p50_us": round(_percentile(samples, 50) * 1e6, 1),
+            "p99_us": round(_percentile(samples, 99) * 1e6, 1),
+            "max_us": round(max(samples) * 1e6, 1),
+        })
+    return report
+
+_MEMORY_PROBE = """
+import gc, json, resource
+from combined_processor import process_email, RESULT_CACHE
+from sample_corpus import build_email_of_size
+RESULT_CACHE.enabled = False
+
+email = build_email_of_size({source!r}, {target_bytes}, noisy={noisy})
+gc.collect()
+before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+result, status = process_email(email)
+after_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"html_bytes": len(email['metadata']['content']['html']), "status": status,
+                   "before_kb": before_kb, "after_kb": after_kb}}))
+"""
+
+def bench_memory(sizes: List[str], sources: List[str], noisy: bool) -> List[Dict]:
+    """Peak RSS while processing one email, per size and source, with and without pre-parse stripping."""
+    report = []
+    for source in sources:
+        for size in sizes:
+            for strip in (False, True):
+                probe = _MEMORY_PROBE.format(source=source, target_bytes=parse_size(size), noisy=noisy)
+                output = subprocess.run(
+                    [sys.executable, '-c', probe],
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                    env={**os.environ, "STRIP_NOISE": '1' if strip else '0', "DEDUP_INDEX_PATH": '', "LOG_LEVEL": 'WARNING'},
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                run = json.loads(output.strip().splitlines()[-1])
+                report.append({
+                    "source": source,
+                    "size": size,
+                    "html_bytes": run['html_bytes'],
+                    "noisy_html": noisy,
+                    "strip_noise": strip,
+                    "status": run['status'],
+                    "baseline_rss_mb": round(run['before_kb'] / 1024, 1),
+                    "peak_rss_mb": round(run['after_kb'] / 1024, 1),
+                    "processing_rss_mb": round((run['after_kb'] - run['before_kb']) / 1024, 1),
+                    "rss_per_html_byte": round((run['after_kb'] - run['before_kb']) * 1024 / run['html_bytes'], 1),
+                })
+    return report
+
+def bench_categorize(batch_sizes: List[int]) -> List[Dict]:
+    """Blocks/second categorizing batches in one multiply vs scoring each block on its own."""
+    import categorizer
+    model = categorizer.get_category_model()
+    blocks = []
+    for source in SOURCES:
+        result, _ = process_email(build_email(source, 50, seed=11))
+        blocks.extend(result['content']['content_blocks'])
+    texts = [f"{block.get('title', '')}\n{block.get('body_text', '')}" for block in blocks]
+
+    report = []
+    for batch_size in batch_sizes:
+        batch = [texts[i % len(texts)] for i in range(batch_size)]
+        repeat = max(1, 2000 // batch_size)
+        batched = _time_call(lambda: model.categorize(batch), repeat)
+        per_block = _time_call(lambda: [model.categorize([text]) for text in batch], max(1, repeat // 10))
+        report.append({
+            "batch_size": batch_size,
+            "batched_blocks_per_second": round(batch_size / batched, 1),
+            "per_block_blocks_per_second": round(batch_size / per_block, 1),
+            "speedup": round(per_block / batched, 2),
+        })
+    return report
+
+def bench_summarize(word_counts: List[int], repeat: int) -> List[Dict]:
+    """Summary latency per text length: cold (distinct texts) and from the cache."""
+    import random
+    import summarizer
+    from sample_corpus import _paragraph
+
+    report = []
+    for words in word_counts:
+        texts = []
+        for seed in range(repeat):
+            rng, paragraphs = random.Random(seed), []
+            while sum(len(paragraph.split()) for paragraph in paragraphs) < words:
+                paragraphs.append(_paragraph(rng))
+            texts.append("\n\n".join(paragraphs))
+
+        cold = []
+        for text in texts:
+            start = time.perf_counter()
+            summarizer.summarize(text)
+            cold.append(time.perf_counter() - start)
+        cached = _time_call(lambda: summarizer.summarize(texts[0]), 20)
+        report.append({
+            "words": words,
+            "sentences": len(summarizer.split_sentences(texts[0])),
+            "ranked_units": min(len(summarizer.split_sentences(texts[0])), summarizer.SUMMARY_MAX_UNITS),
+            "cold_p50_ms": round(_percentile(cold, 50) * 1000, 3),
+            "cold_p95_ms": round(_percentile(cold, 95) * 1000, 3),
+            "cached_ms": round(cached * 1000, 3),
+        })
+    return report
+
+def _legacy_axios_text(soup) -> List[str]:
+    return ["\n\n".join([p.get_text(strip=True) for p in section.find_all('p')])
+            for section in soup.find_all('td', class_='post-text')]
+
+def _legacy_no_mercy_no_malice_text(soup) -> List[str]:
+    sections = soup.find('tr', id='content-blocks').find_all('td', class_='dd')
+    full_content = "\n\n".join([section.get_text(strip=True) for section in sections])
+    full_content = re.sub(r'\nP\.S\..+', '', full_content, flags=re.DOTALL)
+    return [re.sub(r'\nP\.P\.S\..+', '', full_content, flags=re.DOTALL).strip()]
+
+def _legacy_seth_godin_text(soup) -> List[str]:
+    container = soup.find('div', class_='rssDesc')
+    return ["\n\n".join([p.get_text(strip=True) for p in container.find_all('p') if p.get_text(strip=True)])]
+
+def _legacy_hbr_management_tip_text(soup) -> List[str]:
+    content_div = soup.find('div', style=lambda s: s and 'font-family:Georgia' in s)
+    return ["\n\n".join([p.get_text(strip=True) for p in content_div.find_all('p')])]
+
+def _legacy_dorie_clark_text(soup) -> List[str]:
+    content, ad_counter, in_ad_section = [], 0, False
+    for elem in soup.find('div', class_='message-content').find_all(['p', 'ul', 'ol', 'h2']):
+        text = elem.get_text(strip=True)
+        if "***" in text:
+            ad_counter += 1
+            in_ad_section = ad_counter % 2 != 0
+            continue
+        if not in_ad_section:
+            if elem.name == 'p':
+                content.append(text)
+            elif elem.name in ['ul', 'ol']:
+                for li in elem.find_all('li'):
+                    content.append(f"- {li.get_text(strip=True)}")
+        if text.startswith('PS -'):
+            break
+    return ['\n\n'.join(content)]
+
+# The find_all/get_text extraction each processor used before text_extraction
+LEGACY_TEXT_EXTRACTORS = {
+    'axios': _legacy_axios_text,
+    'no_mercy_no_malice': _legacy_no_mercy_no_malice_text,
+    'seth_godin': _legacy_seth_godin_text,
+    'hbr_management_tip': _legacy_hbr_management_tip_text,
+    'dorie_clark': _legacy_dorie_clark_text,
+}
+
+def _counting_descendants():
+    """Patch Tag.descendants to count visited nodes (find_all and get_text both walk it)."""
+    from bs4.element import Tag
+    original = Tag.descendants
+    visited = [0]
+
+    def descendants(tag):
+        for node in original.fget(tag):
+            visited[0] += 1
+            yield node
+
+    Tag.descendants = property(descendants)
+    return visited, lambda: setattr(Tag, 'descendants', original)
+
+def _single_pass_dorie_clark_text(soup) -> List[str]:
+    import text_extraction
+    content, ad_counter, in_ad_section = [], 0, False
+    for item in text_extraction.iter_text_items(soup.find('div', class_='message-content'), ('p', 'ul', 'ol', 'h2')):
+        if "***" in item.text:
+            ad_counter += 1
+            in_ad_section = ad_counter % 2 != 0
+            continue
+        if not in_ad_section:
+            if item.tag == 'p':
+                content.append(item.text)
+            elif item.tag in ('ul', 'ol'):
+                content.extend(f"- {li}" for li in item.list_items)
+        if item.text.startswith('PS -'):
+            break
+    return ['\n\n'.join(content)]
+
+def _single_pass_no_mercy_no_malice_text(soup) -> List[str]:
+    import text_extraction
+    full_content = text_extraction.joined_text(soup.find('tr', id='content-blocks').find_all('td', class_='dd'))
+    full_content = re.sub(r'\nP\.S\..+', '', full_content, flags=re.DOTALL)
+    return [re.sub(r'\nP\.P\.S\..+', '', full_content, flags=re.DOTALL).strip()]
+
+def bench_text(stories_list: List[int], repeat: int) -> List[Dict]:
+    """Legacy find_all/get_text vs single-pass text extraction: nodes walked and time."""
+    from bs4 import BeautifulSoup
+    import text_extraction
+
+    current = {
+        'axios': lambda soup: ["\n\n".join(item.text for item in text_extraction.iter_text_items(section))
+                               for section in soup.find_all('td', class_='post-text')],
+        'no_mercy_no_malice': _single_pass_no_mercy_no_malice_text,
+        'seth_godin': lambda soup: ["\n\n".join(
+            item.text for item in text_extraction.iter_text_items(soup.find('div', class_='rssDesc')) if item.text)],
+        'hbr_management_tip': lambda soup: ["\n\n".join(item.text for item in text_extraction.iter_text_items(
+            soup.find('div', style=lambda s: s and 'font-family:Georgia' in s)))],
+        'dorie_clark': _single_pass_dorie_clark_text,
+    }
+
+    report = []
+    for source, legacy in LEGACY_TEXT_EXTRACTORS.items():
+        for stories in stories_list:
+            html = build_email(source, stories)['metadata']['content']['html']
+            soup = BeautifulSoup(html, 'lxml')
+            walks = {}
+            for name, extract in (('legacy', legacy), ('single_pass', current[source])):
+                visited, restore = _counting_descendants()
+                try:
+                    extract(soup)
+                finally:
+                    restore()
+                walks[name] = visited[0]
+            legacy_time = _time_call(lambda: legacy(soup), repeat)
+            current_time = _time_call(lambda: current[source](soup), repeat)
+            report.append({
+                "source": source,
+                "stories": stories,
+                "legacy_nodes_walked": walks['legacy'],
+                "single_pass_nodes_walked": walks['single_pass'],
+                "legacy_ms": round(legacy_time * 1000, 3),
+                "single_pass_ms": round(current_time * 1000, 3),
+                "speedup": round(legacy_time / current_time, 2),
+            })
+    return report
+
+def _legacy_simon_sinek_lookup(soup) -> List:
+    return [soup.find('img', class_='stretch-on-mobile'),
+            soup.find('div', id=lambda x: x and x.startswith('hs_cos_wrapper_module-0-0-1_'))]
+
+def _legacy_hbr_management_tip_lookup(soup) -> List:
+    main_content = soup.find('table', class_='row-content stack')
+    return [main_content.find('h1'),
+            main_content.find('div', style=lambda s: s and 'font-family:Georgia,Times,\'Times New Roman\',serif' in s),
+            main_content.find('div', style=lambda s: s and 'font-family:Helvetica Neue,Helvetica,Arial,sans-serif' in s)]
+
+def _legacy_campaign_brief_lookup(soup) -> List:
+    found = []
+    rss_column = soup.find('table', id='rssColumn')
+    for block in rss_column.find_all('div', style=lambda value: value and 'text-align: left;color: #656565;min-width: 300px;' in value):
+        found.extend([block, block.find('img', class_='mc-rss-item-img'),
+                      block.find('a', style=lambda value: value and "font-family: 'Oswald'" in value),
+                      block.find('div', id='rssContent')])
+    return found
+
+# The lambda-based lookups these processors used before selector_index
+LEGACY_SELECTOR_LOOKUPS = {
+    'simon_sinek': _legacy_simon_sinek_lookup,
+    'hbr_management_tip': _legacy_hbr_management_tip_lookup,
+    'campaign_brief': _legacy_campaign_brief_lookup,
+}
+
+def _selector_lookup(source: str, soup) -> List:
+    import combined_processor as cp
+    from selector_index import SelectorIndex
+    if source == 'simon_sinek':
+        return [cp.SIMON_SINEK_IMAGE.select_one(soup), cp.SIMON_SINEK_BODY.select_one(soup)]
+    if source == 'hbr_management_tip':
+        index = SelectorIndex(soup.find('table', class_='row-content stack'))
+        return [index.select_one(cp.HBR_MANAGEMENT_TIP_TITLE), index.select_one(cp.HBR_MANAGEMENT_TIP_BODY),
+                index.select_one(cp.HBR_MANAGEMENT_TIP_SOURCE)]
+    index = SelectorIndex(soup.find('table', id='rssColumn'))
+    found = []
+    for block in index.select(cp.CAMPAIGN_BRIEF_STORY):
+        found.extend([block, index.select_one(cp.CAMPAIGN_BRIEF_IMAGE, within=block),
+                      index.select_one(cp.CAMPAIGN_BRIEF_HEADLINE, within=block),
+                      index.select_one(cp.CAMPAIGN_BRIEF_DESCRIPTION, within=block)])
+    return found
+
+def _reformat_styles(html: str) -> str:
+    """The same email with inline styles reformatted the way another template engine might."""
+    return re.sub(r'style="([^"]*)"', lambda m: 'style="' + re.sub(r'\s*([:;,])\s*', r'\1 ', m.group(1)).strip() + '"', html)
+
+def bench_selectors(stories_list: List[int], repeat: int) -> List[Dict]:
+    """Lambda find()s vs declared selectors: time, and matches after the styles are reformatted."""
+    from bs4 import BeautifulSoup
+    import selector_index
+
+    report = []
+    for source, legacy in LEGACY_SELECTOR_LOOKUPS.items():
+        for stories in stories_list:
+            html = build_email(source, stories)['metadata']['content']['html']
+            soup = BeautifulSoup(html, 'lxml')
+            reformatted = BeautifulSoup(_reformat_styles(html), 'lxml')
+            legacy_time = _time_call(lambda: legacy(soup), repeat)
+            selector_index.stats.clear()
+            selector_time = _time_call(lambda: _selector_lookup(source, soup), repeat)
+            report.append({
+                "source": source,
+                "stories": stories,
+                "legacy_ms": round(legacy_time * 1000, 3),
+                "selector_ms": round(selector_time * 1000, 3),
+                "speedup": round(legacy_time / selector_time, 2),
+                "reformatted_legacy_found": sum(tag is not None for tag in legacy(reformatted)),
+                "reformatted_selector_found": sum(tag is not None for tag in _selector_lookup(source, reformatted)),
+                "selectors": selector_index.selector_report(),
+            })
+    return report
+
+def bench_serialization(block_counts: List[int], repeat: int) -> List[Dict]:
+    """Encoding cost per block count: Flask's stdlib encoding vs json_codec, and as NDJSON lines; plus request decoding."""
+    import json_codec
+    from app import ndjson_lines
+
+    blocks = []
+    for source in ('adweek', 'creative_bloq'):
+        result, _ = process_email(build_email(source, 500, seed=5))
+        blocks.extend(result['content']['content_blocks'])
+
+    report = []
+    for count in block_counts:
+        result, _ = process_email(build_email('adweek', 1, seed=5))
+        result['content']['content_blocks'] = [blocks[i % len(blocks)] for i in range(count)]
+        # What jsonify did before: stdlib, sorted keys, ASCII escapes, compact separators
+        stdlib_body = json.dumps(result, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        request_body = json.dumps(build_email('adweek', max(1, count // 10), seed=5)).encode('utf-8')
+
+        stdlib_time = _time_call(lambda: json.dumps(result, sort_keys=True, separators=(',', ':')).encode('utf-8'), repeat)
+        fast_time = _time_call(lambda: json_codec.dumps(result, sort_keys=True), repeat)
+        ndjson_time = _time_call(lambda: [json_codec.dumps(line) + b"\n" for line in ndjson_lines(result)], repeat)
+        report.append({
+            "blocks": count,
+            "backend": "orjson" if json_codec.USE_ORJSON else "stdlib",
+            "response_kb": round(len(stdlib_body) / 1024, 1),
+            "stdlib_encode_ms": round(stdlib_time * 1000, 3),
+            "codec_encode_ms": round(fast_time * 1000, 3),
+            "ndjson_encode_ms": round(ndjson_time * 1000, 3),
+            "encode_speedup": round(stdlib_time / fast_time, 2),
+            "request_kb": round(len(request_body) / 1024, 1),
+            "stdlib_decode_ms": round(_time_call(lambda: json.loads(request_body), repeat) * 1000, 3),
+            "codec_decode_ms": round(_time_call(lambda: json_codec.loads(request_body), repeat) * 1000, 3),
+        })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Newsletter processor benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    processors_cmd = subparsers.add_parser('processors', help="Latency percentiles, throughput and peak memory per source and backend")
+    processors_cmd.add_argument('--stories', type=int, nargs='*', default=[1, 10, 100, 500])
+    processors_cmd.add_argument('--sizes', nargs='*', default=[], help="Target HTML sizes, e.g. 10KB 1MB 5MB")
+    processors_cmd.add_argument('--backend', action='append', help="Parser backend (default: lxml and html.parser)")
+    processors_cmd.add_argument('--repeat', type=int, default=20)
+    processors_cmd.add_argument('--fixtures', help="Directory of saved request payloads (*.json) to include")
+    processors_cmd.add_argument('--output', help="Also write the results, with commit and platform, to this file")
+
+    compare_cmd = subparsers.add_parser('compare', help="Compare two saved processor runs; exits 1 on regressions")
+    compare_cmd.add_argument('baseline')
+    compare_cmd.add_argument('current')
+    compare_cmd.add_argument('--threshold', type=float, default=1.2, help="p50 ratio counted as a regression")
+
+    parsers_cmd = subparsers.add_parser('parsers', help="html.parser vs lxml speed per source")
+    parsers_cmd.add_argument('--stories', type=int, default=20)
+    parsers_cmd.add_argument('--repeat', type=int, default=5)
+    parsers_cmd.add_argument('--fixtures', help="Directory of saved request payloads (*.json) to include")
+
+
+    regions_cmd = subparsers.add_parser('regions', help="Full vs partial (SoupStrainer) parsing per source")
+    regions_cmd.add_argument('--stories', type=int, default=20)
+    regions_cmd.add_argument('--repeat', type=int, default=5)
+    regions_cmd.add_argument('--fixtures', help="Directory of saved request payloads (*.json) to include")
+
+    ads_cmd = subparsers.add_parser('ads', help="Legacy vs compiled ad detection over extracted blocks")
+    ads_cmd.add_argument('--stories', type=int, default=20)
+    ads_cmd.add_argument('--repeat', type=int, default=20)
+    ads_cmd.add_argument('--fixtures', help="Directory of saved request payloads (*.json) to include")
+
+    translation_cmd = subparsers.add_parser('translation', help="Per-field vs batched translation requests (local stub API)")
+    translation_cmd.add_argument('--stories', type=int, default=20)
+    translation_cmd.add_argument('--latency-ms', type=float, default=20.0, help="Simulated API latency per request")
+
+    startup_cmd = subparsers.add_parser('startup', help="Cold import time and RSS per module in a fresh interpreter")
+    startup_cmd.add_argument('--repeat', type=int, default=5)
+    startup_cmd.add_argument('--module', action='append', help="Module to import (default: app, combined_processor, translator)")
+
+    logging_cmd = subparsers.add_parser('logging', help="Request throughput at DEBUG (with and without body logging) vs the structured default")
+    logging_cmd.add_argument('--stories', type=int, default=20)
+    logging_cmd.add_argument('--requests', type=int, default=300)
+
+    dedup_cmd = subparsers.add_parser('dedup', help="Cross-newsletter dedup lookup latency with a large index")
+    dedup_cmd.add_argument('--entries', type=int, default=300000)
+    dedup_cmd.add_argument('--lookups', type=int, default=5000)
+
+    memory_cmd = subparsers.add_parser('memory', help="Peak RSS per email size in a fresh interpreter")
+    memory_cmd.add_argument('--sizes', nargs='*', default=['100KB', '1MB', '5MB'])
+    memory_cmd.add_argument('--source', action='append', choices=sorted(SOURCES), help="Default: generic, adweek")
+    memory_cmd.add_argument('--clean', action='store_true', help="Generate emails without marketing-tool noise")
+
+    categorize_cmd = subparsers.add_parser('categorize', help="Category scoring throughput per batch size")
+    categorize_cmd.add_argument('--batch-sizes', type=int, nargs='*', default=[1, 100, 10000])
+
+    summarize_cmd = subparsers.add_parser('summarize', help="Extractive summary latency per text length, cold and cached")
+    summarize_cmd.add_argument('--words', type=int, nargs='*', default=[1000, 10000, 50000])
+    summarize_cmd.add_argument('--repeat', type=int, default=10)
+
+    text_cmd = subparsers.add_parser('text', help="Legacy find_all/get_text vs single-pass text extraction on long newsletters")
+    text_cmd.add_argument('--stories', type=int, nargs='*', default=[20, 200])
+    text_cmd.add_argument('--repeat', type=int, default=20)
+
+    selectors_cmd = subparsers.add_parser('selectors', help="Lambda find()s vs declared selectors (and the per-document index)")
+    selectors_cmd.add_argument('--stories', type=int, nargs='*', default=[20, 200])
+    selectors_cmd.add_argument('--repeat', type=int, default=20)
+
+    serialization_cmd = subparsers.add_parser('serialization', help="Response encoding and request decoding cost per block count")
+    serialization_cmd.add_argument('--blocks', type=int, nargs='*', default=[10, 100, 1000, 5000])
+    serialization_cmd.add_argument('--repeat', type=int, default=20)
+
+    args = parser.parse_args()
+    # Measure real processing, not cache hits
+    RESULT_CACHE.enabled = False
+
+    if args.command == 'processors':
+        report = bench_processors(args.stories, args.sizes, args.backend or ['lxml', 'html.parser'], args.repeat, args.fixtures)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({"meta": benchmark_metadata(), "results": report}, f, indent=2)
+    elif args.command == 'compare':
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r') as f:
+            current = json.load(f)
+        report = compare_runs(baseline, current, args.threshold)
+    elif args.command == 'parsers':
+        report = bench_parsers(args.stories, args.repeat, args.fixtures)
+    elif args.command == 'regions':
+        report = bench_regions(args.stories, args.repeat, args.fixtures)
+    elif args.command == 'ads':
+        report = bench_ads(args.stories, args.repeat, args.fixtures)
+    elif args.command == 'translation':
+        report = bench_translation(args.stories, args.latency_ms)
+    elif args.command == 'startup':
+        report = bench_startup(args.repeat, args.module or ['app', 'combined_processor', 'translator'])
+    elif args.command == 'logging':
+        report = bench_logging(args.stories, args.requests)
+    elif args.command == 'dedup':
+        report = bench_dedup(args.entries, args.lookups)
+    elif args.command == 'memory':
+        report = bench_memory(args.sizes, args.source or ['generic', 'adweek'], not args.clean)
+    elif args.command == 'categorize':
+        report = bench_categorize(args.batch_sizes)
+    elif args.command == 'summarize':
+        report = bench_summarize(args.words, args.repeat)
+    elif args.command == 'text':
+        report = bench_text(args.stories, args.repeat)
+    elif args.command == 'selectors':
+        report = bench_selectors(args.stories, args.repeat)
+    elif args.command == 'serialization':
+        report = bench_serialization(args.blocks, args.repeat)
+
+    print(json.dumps(report, indent=2))
+    if any(row.get('regression') for row in report):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
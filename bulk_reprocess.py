@@ -0,0 +1,276 @@
+"""
+Reprocess an archive of email payloads offline.
+
+Reads JSONL (one /process_email payload per line, optionally gzip) as a stream, processes
+it on a process pool with a bounded number of chunks in flight, and writes one result
+line per input line, in input order:
+
+    python bulk_reprocess.py archive.jsonl.gz -o results.jsonl.gz
+    python bulk_reprocess.py archive.jsonl.gz -o results.jsonl.gz --resume   # after a crash/stop
+
+A checkpoint (<output>.checkpoint) records how far input and output got; --resume seeks
+the input past finished lines and truncates the output back to the last checkpoint.
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import json_codec
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', os.cpu_count() or 1))
+DEFAULT_CHUNK_SIZE = 16
+DEFAULT_CHECKPOINT_EVERY = 1000
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+def _is_gzip(path: str) -> bool:
+    if path.endswith('.gz'):
+        return True
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+def open_input(path: str, offset: int = 0) -> BinaryIO:
+    """Open the archive (plain or gzip, '-' for stdin) positioned at an uncompressed byte offset."""
+    if path == '-':
+        stream = sys.stdin.buffer
+        # stdin can't seek; read past the finished part instead
+        remaining = offset
+        while remaining:
+            skipped = len(stream.read(min(remaining, 1 << 20)))
+            if not skipped:
+                break
+            remaining -= skipped
+        return stream
+
+    stream = gzip.open(path, 'rb') if _is_gzip(path) else open(path, 'rb')
+    if offset:
+        # gzip streams seek by decompressing forward, without buffering the skipped part
+        stream.seek(offset)
+    return stream
+
+def read_chunks(stream: BinaryIO, start_line: int, start_offset: int,
+                chunk_size: int) -> Iterator[Tuple[List[Tuple[int, bytes]], int, int]]:
+    """Lazily yield ([(line_number, raw_line), ...], last line number, input offset after the chunk)."""
+    chunk, line_number, offset, yielded_offset = [], start_line, start_offset, start_offset
+    for raw in stream:
+        offset += len(raw)
+        line_number += 1
+        if raw.strip():
+            chunk.append((line_number, raw))
+        if len(chunk) >= chunk_size:
+            yield chunk, line_number, offset
+            chunk, yielded_offset = [], offset
+    if offset != yielded_offset:
+        # Trailing lines (possibly only blank ones) still move the checkpoint forward
+        yield chunk, line_number, offset
+
+def _init_worker(use_cache: bool, use_dedup: bool) -> None:
+    import dedup_index
+    from combined_processor import RESULT_CACHE
+    # Archive runs would otherwise fill the result cache (and Redis) with one-off entries
+    RESULT_CACHE.enabled = use_cache
+    # ...and write old stories into the cross-newsletter dedup index production reads
+    dedup_index.DEDUP_ENABLED = use_dedup
+
+def _process_chunk(chunk: List[Tuple[int, bytes]]) -> List[bytes]:
+    """Runs in a pool worker: parse, process and serialize, so the parent only moves bytes."""
+    from combined_processor import process_email
+    lines = []
+    for line_number, raw in chunk:
+        try:
+            data = json_codec.loads(raw)
+        except ValueError as e:
+            result, status_code = {"error": f"Invalid JSON: {str(e)}"}, 400
+        else:
+            if isinstance(data, dict):
+                result, status_code = process_email(data)
+            else:
+                result, status_code = {"error": "Invalid JSON structure"}, 400
+        lines.append(json_codec.dumps({"line": line_number, "status": status_code, "result": result}) + b'\n')
+    return lines
+
+def is_regular_output(path: str) -> bool:
+    """Only regular files can be truncated and resumed; not stdout, pipes or devices."""
+    return path != '-' and (not os.path.exists(path) or os.path.isfile(path))
+
+class ResultWriter:
+    """
+    Appends result lines to a plain or gzip file (or stdout).
+    Gzip output is written as one gzip member per checkpoint, so every checkpoint
+    offset is a clean member boundary that a resume can truncate back to.
+    """
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.compress = path.endswith('.gz')
+        self.resumable = is_regular_output(path)
+        if path == '-':
+            self.raw = sys.stdout.buffer
+        elif is_regular_output(path) and os.path.exists(path):
+            self.raw = open(path, 'r+b')
+            self.raw.truncate(offset)
+            self.raw.seek(offset)
+        else:
+            self.raw = open(path, 'wb')
+        self.stream = self._member()
+
+    def _member(self):
+        return gzip.GzipFile(fileobj=self.raw, mode='wb') if self.compress else self.raw
+
+    def write(self, line: bytes) -> None:
+        self.stream.write(line)
+
+    def checkpoint(self) -> int:
+        """Flush everything written so far and return the output size it ends at."""
+        if self.compress:
+            self.stream.close()
+        self.raw.flush()
+        offset = 0
+        if self.resumable:
+            os.fsync(self.raw.fileno())
+            offset = self.raw.tell()
+        if self.compress:
+            self.stream = self._member()
+        return offset
+
+    def close(self) -> int:
+        offset = self.checkpoint()
+        if self.compress:
+            self.stream.close()
+        if self.path != '-':
+            self.raw.close()
+        return offset
+
+def load_checkpoint(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_checkpoint(path: str, state: Dict) -> None:
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+class Progress:
+    def __init__(self, every_seconds: float):
+        self.every_seconds = every_seconds
+        self.started = self.last = time.perf_counter()
+        self.records = 0
+        self.input_bytes = 0
+
+    def update(self, records: int, input_bytes: int, line: int, in_flight: int, force: bool = False) -> None:
+        self.records += records
+        self.input_bytes += input_bytes
+        now = time.perf_counter()
+        if not force and now - self.last < self.every_seconds:
+            return
+        self.last = now
+        elapsed = max(now - self.started, 1e-9)
+        logger.info(
+            "line %d: %d records in %.1fs (%.1f records/s, %.2f MB/s), %d chunks in flight",
+            line, self.records, elapsed, self.records / elapsed, self.input_bytes / elapsed / (1024 * 1024), in_flight,
+        )
+
+def reprocess(input_path: str, output_path: str, workers: int = DEFAULT_WORKERS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              max_in_flight: Optional[int] = None, checkpoint_path: Optional[str] = None, resume: bool = False,
+              checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY, progress_every: float = 5.0, use_cache: bool = False,
+              use_dedup: bool = False) -> Dict:
+    """
+    Stream input_path through process_email into output_path, preserving order.
+    At most max_in_flight chunks of chunk_size lines are held in memory at a time.
+    """
+    max_in_flight = max_in_flight or workers * 2
+    if checkpoint_path is None and is_regular_output(output_path):
+        checkpoint_path = f"{output_path}.checkpoint"
+
+    state = {"input": input_path, "line": 0, "input_offset": 0, "output_offset": 0}
+    if resume and checkpoint_path:
+        saved = load_checkpoint(checkpoint_path)
+        if saved:
+            if saved.get('input') != input_path:
+                raise ValueError(f"Checkpoint {checkpoint_path} belongs to {saved.get('input')}, not {input_path}")
+            state = saved
+            logger.info("Resuming %s from line %d", input_path, state['line'])
+
+    stream = open_input(input_path, state['input_offset'])
+    writer = ResultWriter(output_path, state['output_offset'] if resume else 0)
+    progress = Progress(progress_every)
+    pending = deque()
+    since_checkpoint = 0
+
+    def drain_one():
+        nonlocal since_checkpoint
+        future, line, offset = pending.popleft()
+        lines = future.result()
+        for result_line in lines:
+            writer.write(result_line)
+        progress.update(len(lines), offset - state['input_offset'], line, len(pending))
+        state['line'], state['input_offset'] = line, offset
+        since_checkpoint += len(lines)
+        if checkpoint_path and since_checkpoint >= checkpoint_every:
+            state['output_offset'] = writer.checkpoint()
+            save_checkpoint(checkpoint_path, state)
+            since_checkpoint = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_cache, use_dedup)) as executor:
+        try:
+            for chunk, line, offset in read_chunks(stream, state['line'], state['input_offset'], chunk_size):
+                if len(pending) >= max_in_flight:
+                    drain_one()
+                pending.append((executor.submit(_process_chunk, chunk), line, offset))
+            while pending:
+                drain_one()
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+            state['output_offset'] = writer.close()
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, state)
+
+    progress.update(0, 0, state['line'], 0, force=True)
+    elapsed = time.perf_counter() - progress.started
+    return {
+        "records": progress.records,
+        "last_line": state['line'],
+        "elapsed_seconds": round(elapsed, 3),
+        "records_per_second": round(progress.records / elapsed, 2) if elapsed > 0 else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocess a JSONL (optionally gzip) archive of email payloads")
+    parser.add_argument('input', help="Input JSONL or JSONL.gz file, or - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="Output JSONL (.gz to compress), or - for stdout")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Lines sent to a worker at once")
+    parser.add_argument('--max-in-flight', type=int, help="Chunks submitted but not yet written (default: 2 x workers)")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument('--checkpoint-every', type=int, default=DEFAULT_CHECKPOINT_EVERY, help="Records between checkpoints")
+    parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint")
+    parser.add_argument('--progress-every', type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument('--use-cache', action='store_true', help="Read and fill the result cache")
+    parser.add_argument('--use-dedup', action='store_true', help="Check and fill the cross-newsletter dedup index")
+    args = parser.parse_args()
+
+    summary = reprocess(
+        args.input, args.output, workers=args.workers, chunk_size=args.chunk_size, max_in_flight=args.max_in_flight,
+        checkpoint_path=args.checkpoint, resume=args.resume, checkpoint_every=args.checkpoint_every,
+        progress_every=args.progress_every, use_cache=args.use_cache, use_dedup=args.use_dedup,
+    )
+    logger.info("Done: %s", json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import re
+import json
+import pickle
+import stat
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+from newsletter_utils import get_config
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Bump when the analyzer or model layout changes; invalidates pickled models
+MODEL_VERSION = '3'
+# Unpickling runs code, so the model lives in the app directory (not a shared /tmp path) and is
+# only loaded when this user owns it and nobody else can write it. Empty disables saving it.
+CATEGORY_MODEL_PATH = os.environ.get(
+    'CATEGORY_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_model.pkl'))
+CATEGORY_TOP_K = int(os.environ.get('CATEGORY_TOP_K', 3))
+# Cosine similarity a block needs with a category's terms to be tagged with it
+CATEGORY_MIN_SCORE = float(os.environ.get('CATEGORY_MIN_SCORE', 0.08))
+# How far a tagged category must score above the best one left out; near-ties at the cut are dropped
+CATEGORY_MIN_MARGIN = float(os.environ.get('CATEGORY_MIN_MARGIN', 0.02))
+
+WORD = re.compile(r'[a-z0-9]+')
+SUFFIXES = ('ations', 'ation', 'ments', 'ment', 'ings', 'ing', 'ies', 'ers', 'er', 'es', 's', 'y')
+# Words suffix stripping would merge with a different topic: 'marketing' isn't 'market' (finance),
+# and 'leaders' isn't 'lead' (sales)
+STEM_EXCEPTIONS = {'marketing': 'marketing', 'marketings': 'marketing', 'marketer': 'marketing', 'marketers': 'marketing',
+                   'leader': 'leader', 'leaders': 'leader'}
+
+@lru_cache(maxsize=65536)
+def _stem(word: str) -> str:
+    """Crude suffix stripping so 'branding'/'brands'/'brand' and 'investing'/'investment' meet."""
+    if word in STEM_EXCEPTIONS:
+        return STEM_EXCEPTIONS[word]
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+def analyze(text: str) -> List[str]:
+    """Stemmed unigrams and bigrams, without stop words. Module-level so the model pickles."""
+    stems = [_stem(word) for word in WORD.findall(text.lower()) if word not in ENGLISH_STOP_WORDS]
+    return stems + [f"{a} {b}" for a, b in zip(stems, stems[1:])]
+
+def category_descriptors(config: Dict) -> Dict[str, str]:
+    """Text each category is matched on: its name plus any extra terms under 'category_terms'."""
+    terms = config.get('category_terms', {})
+    return {name: " ".join([name, *terms.get(name, [])]) for name in config['categories']}
+
+class CategoryModel:
+    """
+    The taxonomy as an L2-normalized TF-IDF matrix (terms x categories). IDF is fitted
+    on the category descriptors, so words shared by many categories ('management',
+    'marketing') count for little. Scoring any number of blocks is one sparse multiply.
+    """
+
+    def __init__(self, descriptors: Dict[str, str]):
+        self.names = list(descriptors)
+        self.vectorizer = TfidfVectorizer(analyzer=analyze, sublinear_tf=True, dtype=np.float32)
+        self.matrix = self.vectorizer.fit_transform(descriptors.values()).T.tocsr()
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), categories) cosine similarities."""
+        return (self.vectorizer.transform(texts) @ self.matrix).toarray()
+
+    def categorize(self, texts: List[str], top_k: int = CATEGORY_TOP_K, min_score: float = CATEGORY_MIN_SCORE,
+                   min_margin: float = CATEGORY_MIN_MARGIN) -> List[List[str]]:
+        """
+        Up to top_k categories per text, best first (ties in config order). A category is
+        only kept if it clears min_score and beats every category left out by min_margin,
+        so a text that scores about the same for many categories isn't tagged with an arbitrary few.
+        """
+        if not texts:
+            return []
+        scores = self.score(texts)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        top = order[:, :top_k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        if order.shape[1] > top_k:
+            cutoffs = np.maximum(min_score, np.take_along_axis(scores, order[:, top_k:top_k + 1], axis=1)[:, 0] + min_margin)
+        else:
+            cutoffs = np.full(len(texts), min_score)
+        return [
+            [self.names[index] for index, value in zip(row, row_scores) if value >= cutoff]
+            for row, row_scores, cutoff in zip(top.tolist(), top_scores.tolist(), cutoffs.tolist())
+        ]
+
+def _fingerprint(descriptors: Dict[str, str]) -> str:
+    return hashlib.sha256(f"{MODEL_VERSION}\0{json.dumps(descriptors, sort_keys=True)}".encode('utf-8')).hexdigest()
+
+def _is_trusted(f) -> bool:
+    """The open model file is ours and not writable by group or others."""
+    info = os.fstat(f.fileno())
+    return stat.S_ISREG(info.st_mode) and info.st_uid == os.getuid() and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def _load_model(path: str, fingerprint: str) -> Optional[CategoryModel]:
+    try:
+        with open(path, 'rb') as f:
+            if not _is_trusted(f):
+                logger.warning(f"Not loading category model {path}: not owned by this user or writable by others")
+                return None
+            saved = pickle.load(f)
+        if saved.get('fingerprint') == fingerprint:
+            return saved['model']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable category model {path}: {e}")
+    return None
+
+def _save_model(path: str, fingerprint: str, model: CategoryModel):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            pickle.dump({"fingerprint": fingerprint, "model": model}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not save category model to {path}: {e}")
+
+_model: Optional[CategoryModel] = None
+_model_lock = threading.Lock()
+
+def get_category_model() -> CategoryModel:
+    """Return this worker's model: the pickled one if it matches the config, otherwise built (and saved)."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            descriptors = category_descriptors(get_config())
+            fingerprint = _fingerprint(descriptors)
+            _model = _load_model(CATEGORY_MODEL_PATH, fingerprint) if CATEGORY_MODEL_PATH else None
+            if _model is None:
+                _model = CategoryModel(descriptors)
+                if CATEGORY_MODEL_PATH:
+                    _save_model(CATEGORY_MODEL_PATH, fingerprint, _model)
+            logger.info(f"Category model ready: {len(_model.names)} categories, {len(_model.vectorizer.vocabulary_)} terms")
+    return _model
+
+def assign_categories(blocks: List[Dict]) -> List[Dict]:
+    """Add a 'categories' list to every block, scoring all of them in one pass."""
+    texts = [f"{block.get('title', '')}\n{block.get('body_text', '')}" for block in blocks]
+    return [{**block, "categories": categories} for block, categories in zip(blocks, get_category_model().categorize(texts))]
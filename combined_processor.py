@@ -1,17 +1,42 @@
+import os
 import logging
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import parsed_html
+from text_extraction import element_text, iter_text_items, joined_text
+from selector_index import Selector, SelectorIndex
 import re
-from datetime import datetime
-import json
-import html2text
-import requests
-import random
+import copy
+import hashlib
+import time
 from typing import List, Dict, Tuple, Optional
+from newsletter_utils import get_config
+from processor_registry import ProcessorRegistry
+from post_processing import normalize_blocks, run_pipeline, pipeline_for
+from result_cache import ResultCache
+import metrics
+from logging_config import configure_logging
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Bump whenever an extractor or post-processing stage changes output; invalidates cached results
+PROCESSOR_VERSION = '11'
+
+# Routes under "routing" in newsletter_config.json are added when the registry first compiles
+PROCESSOR_REGISTRY = ProcessorRegistry(default='generic', route_loader=lambda: get_config().get('routing', []))
+RESULT_CACHE = ResultCache(PROCESSOR_VERSION)
+
+# Larger emails are rejected with 413 before parsing; a parse tree costs 10-20x the HTML size
+MAX_HTML_CHARS = int(os.environ.get('MAX_HTML_CHARS', 8 * 1024 * 1024))
+
+def email_id(metadata: Dict) -> str:
+    """The Message-ID, or a digest of the HTML for emails without one, so each email stays distinct."""
+    message_id = metadata.get('message-id', '')
+    if message_id:
+        return message_id
+    return 'sha256:' + hashlib.sha256(metadata['content']['html'].encode('utf-8')).hexdigest()
+
 def create_base_output_structure(metadata, source_name):
     return {
         "metadata": {
@@ -28,16 +53,36 @@ def create_base_output_structure(metadata, source_name):
     }
 
 def process_email(data: Dict) -> Tuple[Dict, int]:
+    timings = metrics.start_email()
     try:
         if 'metadata' not in data or 'content' not in data['metadata'] or 'html' not in data['metadata']['content']:
             return {"error": "Invalid JSON structure"}, 400
 
+        html_size = len(data['metadata']['content']['html'])
+        if html_size > MAX_HTML_CHARS:
+            return {"error": f"Email HTML too large: {html_size} characters (max {MAX_HTML_CHARS})"}, 413
+
         metadata = data['metadata']
         sender_email = metadata.get('sender', '').lower()
         sender_name = metadata.get('Sender name', '')
 
-        processor_function = determine_processor(sender_email, sender_name.lower())
+        processor_name, _ = PROCESSOR_REGISTRY.resolve(sender_email, sender_name.lower())
+        stages = pipeline_for(processor_name)
+        timings['processor'] = processor_name
+
+        cache_key = RESULT_CACHE.key(metadata['content']['html'], processor_name, sender_name, stages, metadata.get('message-id', ''))
+        cached = RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            result = create_base_output_structure(metadata, cached['source_name'])
+            result['content'] = copy.deepcopy(cached['content'])
+            result['pipeline'] = {**cached['pipeline'], "cached": True}
+            return result, 200
+
+        processor_function = PROCESSOR_REGISTRY.processors[processor_name]
+        start = time.perf_counter()
         processor_result = processor_function(data)
+        # parse_html credits its own time to the email; the rest of the processor call is extraction
+        metrics.observe_stage('extract', max(time.perf_counter() - start - timings['parse'], 0.0), processor_name)
 
         if processor_result is None:
             logger.error(f"Processor function for {sender_name} returned None")
@@ -49,7 +94,25 @@ def process_email(data: Dict) -> Tuple[Dict, int]:
             result, status_code = processor_result, 200
 
         if status_code == 200 and isinstance(result, dict) and 'content' in result and 'content_blocks' in result['content']:
-            result['content']['content_blocks'] = process_newsletter(result['content']['content_blocks'], sender_name)
+            blocks, pipeline_stats = run_pipeline(
+                result['content']['content_blocks'],
+                stages,
+                {"sender_name": sender_name, "processor": processor_name, "email_id": email_id(metadata),
+                 "date_sent": metadata.get('date', '')}
+            )
+            result['content']['content_blocks'] = blocks
+            result['pipeline'] = pipeline_stats
+            for stage in pipeline_stats['stages']:
+                metrics.observe_stage(stage['stage'], stage['seconds'], processor_name)
+            # A failed translation request leaves original text in the result; retry it next time
+            if any(block.get('translation_fallback') for block in blocks):
+                logger.warning("Not caching result for %s: translation fell back to the original text", processor_name)
+            else:
+                RESULT_CACHE.set(cache_key, copy.deepcopy({
+                    "source_name": result['metadata']['source_name'],
+                    "content": result['content'],
+                    "pipeline": pipeline_stats,
+                }))
         else:
             logger.error(f"Invalid result structure from processor for {sender_name}")
             return {"error": f"Invalid result structure from processor for {sender_name}"}, 500
@@ -61,40 +124,13 @@ def process_email(data: Dict) -> Tuple[Dict, int]:
         return {"error": str(e)}, 500
 
 def process_newsletter(content_blocks: List[Dict], sender_name: str) -> List[Dict]:
-    processed_blocks = []
-    for block in content_blocks:
-        processed_block = {
-            "title": block.get('title', ''),
-            "image_url": block.get('image_url', ''),
-            "body_text": block.get('body_text', ''),
-            "link": block.get('link_url', ''),
-            "credit": sender_name
-        }
-        processed_blocks.append(processed_block)
-    return processed_blocks
+    return list(normalize_blocks(content_blocks, {"sender_name": sender_name}))
 
 def determine_processor(sender_email: str, sender_name: str):
-    processors = {
-        ('sara@axios.com', 'sara fischer'): process_axios_media_trends,
-        ('nomercynomalice@mail.profgalloway.com', 'scott galloway'): process_no_mercy_no_malice,
-        ('notify@sethgodin.com', 'seth godin'): process_seth_godin,
-        ('inspireme@simonsinek.com', 'simon sinek'): process_simon_sinek,
-        ('emailteam@emails.hbr.org', 'harvard business review'): process_hbr_management_tip,
-        ('dorie@dorieclark.com', 'dorie clark'): process_dorie_clark,
-    }
+    return PROCESSOR_REGISTRY.get_processor(sender_email, sender_name)
 
-    for (email, name), processor in processors.items():
-        if email in sender_email and name in sender_name:
-            return processor
-
-    if 'adweek' in sender_name:
-        return process_adweek
-    elif 'campaign brief' in sender_name:
-        return process_campaign_brief
-    elif 'creative bloq' in sender_name:
-        return process_creative_bloq
-    else:
-        return process_generic
+# Story cells plus the headline spans that precede them
+AXIOS_PARSE_REGION = SoupStrainer(['td', 'span'], class_=['post-text', 'bodytext hed'])
 
 def process_axios_media_trends(data: Dict) -> Tuple[Dict, int]:
     logger.debug("Processing Axios Media Trends email")
@@ -102,8 +138,8 @@ def process_axios_media_trends(data: Dict) -> Tuple[Dict, int]:
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Axios Media Trends")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_blocks = extract_axios_content_blocks(soup)
+    with parsed_html(content_html, parse_only=AXIOS_PARSE_REGION) as soup:
+        content_blocks = extract_axios_content_blocks(soup)
     output_json['content']['content_blocks'] = content_blocks
 
     return output_json, 200
@@ -114,13 +150,12 @@ def extract_axios_content_blocks(soup: BeautifulSoup) -> List[Dict]:
 
     for section in story_sections:
         headline = section.find_previous('span', class_='bodytext hed')
-        headline_text = headline.text.strip() if headline else ""
+        headline_text = element_text(headline, strip=False).strip()
 
         if "Axios Pro Reports" in headline_text or "Today's Media Trends" in headline_text:
             continue
 
-        paragraphs = section.find_all('p')
-        content = "\n\n".join([p.get_text(strip=True) for p in paragraphs])
+        content = "\n\n".join(item.text for item in iter_text_items(section))
 
         if not content.strip() and not headline_text.strip():
             continue
@@ -142,14 +177,16 @@ def extract_axios_content_blocks(soup: BeautifulSoup) -> List[Dict]:
 
     return content_blocks
 
+NO_MERCY_NO_MALICE_PARSE_REGION = SoupStrainer('tr', id='content-blocks')
+
 def process_no_mercy_no_malice(data: Dict) -> Tuple[Dict, int]:
     logger.debug("Processing No Mercy No Malice email")
     content_html = data['metadata']['content']['html']
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "No Mercy No Malice")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_blocks = extract_no_mercy_no_malice_content(soup)
+    with parsed_html(content_html, parse_only=NO_MERCY_NO_MALICE_PARSE_REGION) as soup:
+        content_blocks = extract_no_mercy_no_malice_content(soup)
     output_json['content']['content_blocks'] = content_blocks
 
     return output_json, 200
@@ -160,7 +197,7 @@ def extract_no_mercy_no_malice_content(soup: BeautifulSoup) -> List[Dict]:
 
     if main_content:
         content_sections = main_content.find_all('td', class_='dd')
-        full_content = "\n\n".join([section.get_text(strip=True) for section in content_sections])
+        full_content = joined_text(content_sections, "\n\n")
 
         # Remove footer content
         full_content = re.sub(r'\nP\.S\..+', '', full_content, flags=re.DOTALL)
@@ -188,14 +225,16 @@ def extract_no_mercy_no_malice_content(soup: BeautifulSoup) -> List[Dict]:
 
     return content_blocks
 
+SETH_GODIN_PARSE_REGION = SoupStrainer(['img', 'div'], class_=['c24', 'rssDesc'])
+
 def process_seth_godin(data: Dict) -> Tuple[Dict, int]:
     logger.debug("Processing Seth Godin's email")
     content_html = data['metadata']['content']['html']
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Seth Godin's Blog")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_block = extract_seth_godin_content(soup)
+    with parsed_html(content_html, parse_only=SETH_GODIN_PARSE_REGION) as soup:
+        content_block = extract_seth_godin_content(soup)
     if content_block:
         output_json['content']['content_blocks'] = [content_block]
 
@@ -207,11 +246,8 @@ def extract_seth_godin_content(soup: BeautifulSoup) -> Optional[Dict]:
 
     content_container = soup.find('div', class_='rssDesc')
     if content_container:
-        headline = content_container.find('h2')
-        headline_text = headline.get_text(strip=True) if headline else ""
-
-        paragraphs = content_container.find_all('p')
-        content_text = "\n\n".join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
+        headline_text = element_text(content_container.find('h2'))
+        content_text = "\n\n".join(item.text for item in iter_text_items(content_container) if item.text)
 
         return {
             "title": headline_text,
@@ -221,26 +257,33 @@ def extract_seth_godin_content(soup: BeautifulSoup) -> Optional[Dict]:
         }
     return None
 
+# The header image and the hs_cos_wrapper div can't be expressed as one attribute match,
+# so keep every img/div subtree and drop the surrounding layout tables
+SIMON_SINEK_PARSE_REGION = SoupStrainer(['img', 'div'])
+SIMON_SINEK_IMAGE = Selector('simon_sinek.image', 'img', class_='stretch-on-mobile')
+SIMON_SINEK_BODY = Selector('simon_sinek.body', 'div', id_prefix='hs_cos_wrapper_module-0-0-1_')
+
 def process_simon_sinek(data: Dict) -> Tuple[Dict, int]:
     logger.debug("Processing Simon Sinek's email")
     content_html = data['metadata']['content']['html']
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Simon Sinek's Notes to Inspire")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_block = extract_simon_sinek_content(soup)
+    with parsed_html(content_html, parse_only=SIMON_SINEK_PARSE_REGION) as soup:
+        content_block = extract_simon_sinek_content(soup)
     if content_block:
         output_json['content']['content_blocks'] = [content_block]
 
     return output_json, 200
 
 def extract_simon_sinek_content(soup: BeautifulSoup) -> Optional[Dict]:
-    main_image = soup.find('img', class_='stretch-on-mobile')
+    # Two lookups, each near the top of the document: an index would cost more than it saves
+    main_image = SIMON_SINEK_IMAGE.select_one(soup)
     image_url = main_image['src'] if main_image else ""
 
-    content_container = soup.find('div', id=lambda x: x and x.startswith('hs_cos_wrapper_module-0-0-1_'))
+    content_container = SIMON_SINEK_BODY.select_one(soup)
     if content_container:
-        main_content = content_container.get_text(strip=True)
+        main_content = element_text(content_container)
         return {
             "title": "Simon Sinek's Note to Inspire",
             "body_text": main_content,
@@ -249,14 +292,19 @@ def extract_simon_sinek_content(soup: BeautifulSoup) -> Optional[Dict]:
         }
     return None
 
+HBR_MANAGEMENT_TIP_PARSE_REGION = SoupStrainer('table', class_='row-content stack')
+HBR_MANAGEMENT_TIP_TITLE = Selector('hbr_management_tip.title', 'h1')
+HBR_MANAGEMENT_TIP_BODY = Selector('hbr_management_tip.body', 'div', style="font-family:Georgia,Times,'Times New Roman',serif")
+HBR_MANAGEMENT_TIP_SOURCE = Selector('hbr_management_tip.source', 'div', style="font-family:Helvetica Neue,Helvetica,Arial,sans-serif")
+
 def process_hbr_management_tip(data: Dict) -> Tuple[Dict, int]:
     logger.debug("Processing HBR Management Tip email")
     content_html = data['metadata']['content']['html']
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Harvard Business Review Management Tip of the Day")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_block = extract_hbr_management_tip_content(soup)
+    with parsed_html(content_html, parse_only=HBR_MANAGEMENT_TIP_PARSE_REGION) as soup:
+        content_block = extract_hbr_management_tip_content(soup)
     if content_block:
         output_json['content']['content_blocks'] = [content_block]
 
@@ -265,15 +313,14 @@ def process_hbr_management_tip(data: Dict) -> Tuple[Dict, int]:
 def extract_hbr_management_tip_content(soup: BeautifulSoup) -> Optional[Dict]:
     main_content = soup.find('table', class_='row-content stack')
     if main_content:
-        title = main_content.find('h1')
-        title_text = title.get_text(strip=True) if title else ""
+        index = SelectorIndex(main_content)
+        title_text = element_text(index.select_one(HBR_MANAGEMENT_TIP_TITLE))
 
-        content_div = main_content.find('div', style=lambda s: s and 'font-family:Georgia,Times,\'Times New Roman\',serif' in s)
-        tip_paragraphs = content_div.find_all('p') if content_div else []
-        tip_text = "\n\n".join([p.get_text(strip=True) for p in tip_paragraphs])
+        content_div = index.select_one(HBR_MANAGEMENT_TIP_BODY)
+        tip_text = "\n\n".join(item.text for item in iter_text_items(content_div)) if content_div else ""
 
-        source_div = main_content.find('div', style=lambda s: s and 'font-family:Helvetica Neue,Helvetica,Arial,sans-serif' in s)
-        source_text = source_div.get_text(strip=True) if source_div else ""
+        source_div = index.select_one(HBR_MANAGEMENT_TIP_SOURCE)
+        source_text = element_text(source_div)
 
         return {
             "title": title_text,
@@ -283,14 +330,17 @@ def extract_hbr_management_tip_content(soup: BeautifulSoup) -> Optional[Dict]:
         }
     return None
 
+DORIE_CLARK_PARSE_REGION = SoupStrainer('div', class_='message-content')
+DORIE_CLARK_ITEM_TAGS = ('p', 'ul', 'ol', 'h2')
+
 def process_dorie_clark(data: Dict) -> Tuple[Dict, int]:
     logger.debug("Processing Dorie Clark newsletter")
     content_html = data['metadata']['content']['html']
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Dorie Clark Newsletter")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_blocks = extract_dorie_clark_content(soup)
+    with parsed_html(content_html, parse_only=DORIE_CLARK_PARSE_REGION) as soup:
+        content_blocks = extract_dorie_clark_content(soup)
     output_json['content']['content_blocks'] = content_blocks
 
     return output_json, 200
@@ -303,22 +353,20 @@ def extract_dorie_clark_content(soup: BeautifulSoup) -> List[Dict]:
         in_ad_section = False
         ad_counter = 0
 
-        for elem in main_content_div.find_all(['p', 'ul', 'ol', 'h2']):
-            text = elem.get_text(strip=True)
-
-            if "***" in text:
+        for item in iter_text_items(main_content_div, DORIE_CLARK_ITEM_TAGS):
+            if "***" in item.text:
                 ad_counter += 1
                 in_ad_section = ad_counter % 2 != 0
                 continue
 
             if not in_ad_section:
-                if elem.name == 'p':
-                    content.append(text)
-                elif elem.name in ['ul', 'ol']:
-                    for li in elem.find_all('li'):
-                        content.append(f"- {li.get_text(strip=True)}")
+                if item.tag == 'p':
+                    content.append(item.text)
+                elif item.tag in ('ul', 'ol'):
+                    content.extend(f"- {li}" for li in item.list_items)
 
-            if text.startswith('PS -'):
+            # Leaving the loop stops the walk: nothing after the PS is parsed into text
+            if item.text.startswith('PS -'):
                 break
 
         text = '\n\n'.join(content)
@@ -333,14 +381,16 @@ def extract_dorie_clark_content(soup: BeautifulSoup) -> List[Dict]:
 
     return content_blocks
 
+ADWEEK_PARSE_REGION = SoupStrainer(['table', 'div'], class_='em_wrapper')
+
 def process_adweek(data: Dict) -> Tuple[Dict, int]:
     logger.debug("Processing Adweek email")
     content_html = data['metadata']['content']['html']
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Adweek")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_blocks = extract_adweek_content(soup)
+    with parsed_html(content_html, parse_only=ADWEEK_PARSE_REGION) as soup:
+        content_blocks = extract_adweek_content(soup)
     output_json['content']['content_blocks'] = content_blocks
 
     return output_json, 200
@@ -352,14 +402,14 @@ def extract_adweek_content(soup: BeautifulSoup) -> List[Dict]:
     for block in blocks:
         title_elem = block.find(['span', 'td'], class_='em_font_18')
         if title_elem and title_elem.a:
-            title = title_elem.a.text.strip()
+            title = element_text(title_elem.a, strip=False).strip()
             link = title_elem.a.get('href', '')
 
             img_elem = block.find('img', class_='em_full_img')
             image = img_elem['src'] if img_elem else ''
 
             desc_elem = block.find(['span', 'td'], class_='em_font_15')
-            description = desc_elem.text.strip() if desc_elem else ''
+            description = element_text(desc_elem, strip=False).strip()
 
             content_block = {
                 "title": title,
@@ -371,14 +421,20 @@ def extract_adweek_content(soup: BeautifulSoup) -> List[Dict]:
 
     return content_blocks
 
+CAMPAIGN_BRIEF_PARSE_REGION = SoupStrainer('table', id='rssColumn')
+CAMPAIGN_BRIEF_STORY = Selector('campaign_brief.story', 'div', style='text-align: left;color: #656565;min-width: 300px;')
+CAMPAIGN_BRIEF_IMAGE = Selector('campaign_brief.image', 'img', class_='mc-rss-item-img')
+CAMPAIGN_BRIEF_HEADLINE = Selector('campaign_brief.headline', 'a', style="font-family: 'Oswald'")
+CAMPAIGN_BRIEF_DESCRIPTION = Selector('campaign_brief.description', 'div', id='rssContent')
+
 def process_campaign_brief(data):
     logger.debug("Processing Campaign Brief email")
     content_html = data['metadata']['content']['html']
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Campaign Brief")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_blocks = extract_campaign_brief_content(soup)
+    with parsed_html(content_html, parse_only=CAMPAIGN_BRIEF_PARSE_REGION) as soup:
+        content_blocks = extract_campaign_brief_content(soup)
     output_json['content']['content_blocks'] = content_blocks
 
     return output_json, 200
@@ -388,39 +444,41 @@ def extract_campaign_brief_content(soup):
     rss_column = soup.find('table', id='rssColumn')
 
     if rss_column:
-        blocks = rss_column.find_all('div', style=lambda value: value and 'text-align: left;color: #656565;min-width: 300px;' in value)
+        index = SelectorIndex(rss_column)
 
-        for block in blocks:
+        for block in index.select(CAMPAIGN_BRIEF_STORY):
             content = {
                 "block_type": "article"
             }
 
-            img_tag = block.find('img', class_='mc-rss-item-img')
+            img_tag = index.select_one(CAMPAIGN_BRIEF_IMAGE, within=block)
             if img_tag:
                 content['image_url'] = img_tag.get('src', '')
 
-            headline_tag = block.find('a', style=lambda value: value and "font-family: 'Oswald'" in value)
+            headline_tag = index.select_one(CAMPAIGN_BRIEF_HEADLINE, within=block)
             if headline_tag:
-                content['title'] = headline_tag.text.strip()
+                content['title'] = element_text(headline_tag, strip=False).strip()
                 content['link_url'] = headline_tag.get('href', '')
 
-            description_tag = block.find('div', id='rssContent')
+            description_tag = index.select_one(CAMPAIGN_BRIEF_DESCRIPTION, within=block)
             if description_tag:
-                content['body_text'] = description_tag.text.strip()
+                content['body_text'] = element_text(description_tag, strip=False).strip()
 
             if content.get('title') and (content.get('image_url') or content.get('link_url')):
                 content_blocks.append(content)
 
     return content_blocks
 
+CREATIVE_BLOQ_PARSE_REGION = SoupStrainer('table', class_='name-59')
+
 def process_creative_bloq(data):
     logger.debug("Processing Creative Bloq email")
     content_html = data['metadata']['content']['html']
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Creative Bloq")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_blocks = extract_creative_bloq_content(soup)
+    with parsed_html(content_html, parse_only=CREATIVE_BLOQ_PARSE_REGION) as soup:
+        content_blocks = extract_creative_bloq_content(soup)
     output_json['content']['content_blocks'] = content_blocks
 
     return output_json, 200
@@ -439,11 +497,11 @@ def extract_creative_bloq_content(soup):
 
             headline = story.find('div', attrs={'data-testid': 'copy_headline'})
             if headline:
-                story_data['title'] = headline.text.strip()
+                story_data['title'] = element_text(headline, strip=False).strip()
 
             additional_text = story.find('div', class_='name-100')
             if additional_text:
-                story_data['body_text'] = additional_text.text.strip()
+                story_data['body_text'] = element_text(additional_text, strip=False).strip()
 
             link = story.find('a', attrs={'data-testid': 'cta_link'})
             if link:
@@ -464,8 +522,8 @@ def process_generic(data):
     metadata = data['metadata']
     output_json = create_base_output_structure(metadata, "Generic Newsletter")
 
-    soup = BeautifulSoup(content_html, 'html.parser')
-    content_blocks = extract_generic_content(soup)
+    with parsed_html(content_html) as soup:
+        content_blocks = extract_generic_content(soup)
     output_json['content']['content_blocks'] = content_blocks
 
     return output_json, 200
@@ -475,14 +533,14 @@ def extract_generic_content(soup):
 
     # Extract title
     title = soup.find(['h1', 'h2'])
-    title_text = title.text.strip() if title else "Untitled"
+    title_text = element_text(title, strip=False).strip() if title else "Untitled"
 
     # Extract main content
     main_content = soup.find(['div', 'table'], class_=['content', 'main'])
     if not main_content:
         main_content = soup.find('body')
 
-    content = main_content.get_text(strip=True) if main_content else ""
+    content = element_text(main_content)
 
     # Extract first image
     img = soup.find('img')
@@ -502,7 +560,55 @@ def extract_generic_content(soup):
 
     return content_blocks
 
+# Built-in routes, in priority order. Extra routes can be added under "routing"
+# in newsletter_config.json using the same shape.
+BUILTIN_ROUTES = [
+    {"processor": "axios_media_trends",
+     "sender_email": {"type": "substring", "value": "sara@axios.com"},
+     "sender_name": {"type": "substring", "value": "sara fischer"}},
+    {"processor": "no_mercy_no_malice",
+     "sender_email": {"type": "substring", "value": "nomercynomalice@mail.profgalloway.com"},
+     "sender_name": {"type": "substring", "value": "scott galloway"}},
+    {"processor": "seth_godin",
+     "sender_email": {"type": "substring", "value": "notify@sethgodin.com"},
+     "sender_name": {"type": "substring", "value": "seth godin"}},
+    {"processor": "simon_sinek",
+     "sender_email": {"type": "substring", "value": "inspireme@simonsinek.com"},
+     "sender_name": {"type": "substring", "value": "simon sinek"}},
+    {"processor": "hbr_management_tip",
+     "sender_email": {"type": "substring", "value": "emailteam@emails.hbr.org"},
+     "sender_name": {"type": "substring", "value": "harvard business review"}},
+    {"processor": "dorie_clark",
+     "sender_email": {"type": "substring", "value": "dorie@dorieclark.com"},
+     "sender_name": {"type": "substring", "value": "dorie clark"}},
+    {"processor": "adweek", "sender_name": {"type": "substring", "value": "adweek"}},
+    {"processor": "campaign_brief", "sender_name": {"type": "substring", "value": "campaign brief"}},
+    {"processor": "creative_bloq", "sender_name": {"type": "substring", "value": "creative bloq"}},
+]
+
+for _name, _function in [
+    ('axios_media_trends', process_axios_media_trends),
+    ('no_mercy_no_malice', process_no_mercy_no_malice),
+    ('seth_godin', process_seth_godin),
+    ('simon_sinek', process_simon_sinek),
+    ('hbr_management_tip', process_hbr_management_tip),
+    ('dorie_clark', process_dorie_clark),
+    ('adweek', process_adweek),
+    ('campaign_brief', process_campaign_brief),
+    ('creative_bloq', process_creative_bloq),
+    ('generic', process_generic),
+]:
+    PROCESSOR_REGISTRY.register_processor(_name, _function)
+
+PROCESSOR_REGISTRY.load_routes(BUILTIN_ROUTES, source='code')
+
 # Main execution (for testing)
 if __name__ == "__main__":
-    # This block can be used for testing or running the script directly
-    pass
\ No newline at end of file
+    # Process saved request payloads, e.g. fixtures written by sample_corpus.py:
+    #   python combined_processor.py fixtures/adweek-10-stories.json
+    import sys
+    import json
+    for path in sys.argv[1:]:
+        with open(path, 'r') as f:
+            result, status_code = process_email(json.load(f))
+        print(json.dumps({"file": path, "status": status_code, "result": result}, indent=2))
\ No newline at end of file
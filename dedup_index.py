@@ -0,0 +1,407 @@
+import os
+import re
+import json
+import time
+import fcntl
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import numpy as np
+
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Off skips the cross_dedupe stage entirely: nothing is looked up or written to the shared index
+DEDUP_ENABLED = os.environ.get('DEDUP_ENABLED', '1') != '0'
+DEDUP_WINDOW_SECONDS = int(float(os.environ.get('DEDUP_WINDOW_HOURS', 72)) * 3600)
+# Max differing SimHash bits for two blocks to count as the same story
+DEDUP_MAX_DISTANCE = int(os.environ.get('DEDUP_MAX_DISTANCE', 3))
+# 'flag' keeps duplicates with a duplicate_of pointer; 'drop' removes them
+DEDUP_MODE = os.environ.get('DEDUP_MODE', 'flag')
+# Blocks with fewer words than this are only matched by link; short texts collide too easily
+DEDUP_MIN_WORDS = int(os.environ.get('DEDUP_MIN_WORDS', 8))
+# Shared tier: Redis when a URL is set, otherwise a JSONL journal shared by the workers on this host
+DEDUP_REDIS_URL = os.environ.get('DEDUP_REDIS_URL', '')
+DEDUP_INDEX_PATH = os.environ.get('DEDUP_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'newsletter_dedup_index.jsonl'))
+# How often to pull entries other workers added
+DEDUP_SYNC_SECONDS = float(os.environ.get('DEDUP_SYNC_SECONDS', 5))
+
+TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'mkt_tok', '_hsenc', '_hsmi', 'ref', 'cmp', 'cid'}
+WORD = re.compile(r'\w+')
+_BIT_WEIGHTS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+
+def normalize_link(url: str) -> str:
+    """Canonical form of a story link: no scheme, www, tracking parameters, fragment or trailing slash."""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS]
+    return urlunsplit(('', host, parts.path.rstrip('/'), urlencode(sorted(query)), ''))
+
+@lru_cache(maxsize=65536)
+def _word_hash(word: str) -> int:
+    # blake2b rather than hash(): fingerprints are persisted and shared between processes
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def simhash(text: str) -> Tuple[int, int]:
+    """
+    64-bit SimHash over the words of text (weighted by count), and the word count.
+    Word features keep a couple of edits in a paragraph within a few bits; shingles
+    spread one edit over several features and push rewrites past the threshold.
+    """
+    words = WORD.findall(text.lower())
+    if not words:
+        return 0, 0
+    counts = Counter(words)
+    hashes = np.fromiter((_word_hash(word) for word in counts), dtype=np.uint64, count=len(counts))
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    # Per bit: set in the hashes of more than half of the words
+    bit_weights = (((hashes[:, None] & _BIT_WEIGHTS) != 0) * weights[:, None]).sum(axis=0)
+    fingerprint = int(_BIT_WEIGHTS[bit_weights * 2 > len(words)].sum())
+    return fingerprint, len(words)
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def parse_sent_at(value: str) -> Optional[float]:
+    """Epoch seconds of an email date (ISO 8601 or RFC 2822), or None if it can't be parsed."""
+    if not value:
+        return None
+    try:
+        sent = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            sent = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if sent.tzinfo is None:
+        sent = sent.replace(tzinfo=timezone.utc)
+    return sent.timestamp()
+
+def added_at(entry: Dict) -> float:
+    """When the entry was written to the index; entries from before added_at existed only have seen_at."""
+    return entry.get('added_at', entry['seen_at'])
+
+class FileStore:
+    """
+    Append-only JSONL journal of index entries; each worker tails it for entries added by the others.
+    Appends hold a shared lock on <path>.lock and compaction an exclusive one, so no append
+    lands in a journal that is being replaced.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._position = 0
+        self._inode = None
+
+    @contextmanager
+    def _locked(self, operation: int):
+        with open(f"{self.path}.lock", 'a') as lock:
+            fcntl.flock(lock, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def append(self, entry: Dict):
+        with self._locked(fcntl.LOCK_SH), open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def read_new(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode or stat.st_size < self._position:
+            # Compacted (replaced) by another worker: read it again from the start
+            self._inode, self._position = stat.st_ino, 0
+
+        entries = []
+        with open(self.path, 'rb') as f:
+            f.seek(self._position)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # another worker is mid-write; pick it up next sync
+                self._position += len(line)
+                entries.append(json.loads(line))
+        return entries
+
+    def compact(self, cutoff: float) -> List[Dict]:
+        """
+        Rewrite the journal without entries added before cutoff. The journal is re-read under
+        the lock, so every worker's appends are kept; returns the entries this worker hadn't read yet.
+        """
+        with self._locked(fcntl.LOCK_EX):
+            unread = self.read_new()
+            if not os.path.exists(self.path):
+                return unread
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(self.path, 'rb') as journal, open(temp_path, 'wb') as f:
+                for line in journal:
+                    if line.endswith(b'\n') and added_at(json.loads(line)) >= cutoff:
+                        f.write(line)
+            os.replace(temp_path, self.path)
+            stat = os.stat(self.path)
+            self._inode, self._position = stat.st_ino, stat.st_size
+        return unread
+
+class RedisStore:
+    """Index entries in a Redis sorted set scored by time added."""
+
+    KEY = 'dedup:entries'
+
+    def __init__(self, url: str, window_seconds: int = DEDUP_WINDOW_SECONDS):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._since = 0.0
+        self.window_seconds = window_seconds
+
+    def append(self, entry: Dict):
+        pipeline = self._client.pipeline(transaction=False)
+        pipeline.zadd(self.KEY, {json.dumps(entry): added_at(entry)})
+        # Trim on every write and let an idle index expire, so the set stays bounded by the window
+        pipeline.zremrangebyscore(self.KEY, '-inf', f"({added_at(entry) - self.window_seconds}")
+        pipeline.expire(self.KEY, self.window_seconds)
+        pipeline.execute()
+
+    def read_new(self) -> List[Dict]:
+        members = self._client.zrangebyscore(self.KEY, self._since, '+inf')
+        entries = [json.loads(member) for member in members]
+        if entries:
+            # Entries at exactly this score are read again next time; DedupIndex ignores known keys
+            self._since = max(added_at(entry) for entry in entries)
+        return entries
+
+    def compact(self, cutoff: float) -> List[Dict]:
+        self._client.zremrangebyscore(self.KEY, '-inf', f"({cutoff}")
+        return []
+
+class DedupIndex:
+    """
+    Sliding-window index of content blocks seen across newsletters.
+
+    A block is a duplicate of one from a different email sent within the window of it when its
+    normalized link matches, or its SimHash is within max_distance bits. Entries are kept for
+    window_seconds after they were added, and matched by the date the email was sent, so
+    delayed or reprocessed emails are compared with the stories of their own week. Near matches are found by splitting
+    the fingerprint into max_distance + 1 bands: fingerprints that close must agree exactly
+    on at least one band, so a lookup is a few dict probes plus a popcount per candidate.
+    """
+
+    def __init__(self, store=None, window_seconds: int = DEDUP_WINDOW_SECONDS, max_distance: int = DEDUP_MAX_DISTANCE,
+                 sync_seconds: float = DEDUP_SYNC_SECONDS):
+        self.store = store
+        self.window_seconds = window_seconds
+        self.max_distance = max_distance
+        self.sync_seconds = sync_seconds
+        self.band_count = max_distance + 1
+        self.band_bits = 64 // self.band_count
+        self.entries: Dict[str, Dict] = {}
+        # Keys of the live entries with each link, oldest first
+        self.by_link: Dict[str, List[str]] = {}
+        self.bands: List[Dict[int, Set[str]]] = [{} for _ in range(self.band_count)]
+        self.order = deque()
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._expired_since_compaction = 0
+        self.stats = {"lookups": 0, "link_duplicates": 0, "near_duplicates": 0, "added": 0, "expired": 0, "store_errors": 0,
+                      "skipped_no_id": 0}
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.band_count)]
+
+    def _add(self, entry: Dict) -> bool:
+        key = entry['key']
+        if key in self.entries or added_at(entry) < time.time() - self.window_seconds:
+            return False
+        self.entries[key] = entry
+        self.order.append((added_at(entry), key))
+        if entry['link']:
+            self.by_link.setdefault(entry['link'], []).append(key)
+        if entry['fingerprint'] is not None:
+            for band, band_key in zip(self.bands, self._band_keys(entry['fingerprint'])):
+                band.setdefault(band_key, set()).add(key)
+        return True
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        if entry['link']:
+            # Later entries with the link keep matching after the first one expires
+            keys = self.by_link[entry['link']]
+            keys.remove(key)
+            if not keys:
+                del self.by_link[entry['link']]
+        if entry['fingerprint'] is not None:
+            for band, band_key in zip(self.bands, self._band_keys(entry['fingerprint'])):
+                members = band.get(band_key)
+                members.discard(key)
+                if not members:
+                    del band[band_key]
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self.order and self.order[0][0] < cutoff:
+            _, key = self.order.popleft()
+            if key in self.entries:
+                self._remove(key)
+                self.stats['expired'] += 1
+                self._expired_since_compaction += 1
+
+    def _sync(self, now: float):
+        if self.store is None or now - self._last_sync < self.sync_seconds:
+            return
+        self._last_sync = now
+        try:
+            for entry in self.store.read_new():
+                self._add(entry)
+        except Exception as e:
+            logger.warning(f"Dedup index store read failed: {e}")
+            self.stats['store_errors'] += 1
+
+    def _is_other(self, entry: Dict, email_id: str, sent_at: float) -> bool:
+        return entry['email_id'] != email_id and abs(entry['seen_at'] - sent_at) <= self.window_seconds
+
+    def find(self, link: str, fingerprint: Optional[int], email_id: str, sent_at: float) -> Optional[Dict]:
+        """First occurrence (from another email sent within the window) of a block with this link or a close fingerprint."""
+        if link:
+            for key in self.by_link.get(link, ()):
+                if self._is_other(self.entries[key], email_id, sent_at):
+                    self.stats['link_duplicates'] += 1
+                    return self.entries[key]
+        if fingerprint is not None:
+            best = None
+            for band, band_key in zip(self.bands, self._band_keys(fingerprint)):
+                for key in band.get(band_key, ()):
+                    entry = self.entries[key]
+                    if not self._is_other(entry, email_id, sent_at):
+                        continue
+                    if hamming_distance(fingerprint, entry['fingerprint']) <= self.max_distance:
+                        if best is None or entry['seen_at'] < best['seen_at']:
+                            best = entry
+            if best is not None:
+                self.stats['near_duplicates'] += 1
+                return best
+        return None
+
+    def check(self, block: Dict, context: Dict) -> Optional[Dict]:
+        """
+        Look a block up; returns a pointer to its first occurrence, or None after
+        indexing the block as a first occurrence.
+        """
+        link = normalize_link(block.get('link', ''))
+        fingerprint, words = simhash(f"{block.get('title', '')}\n{block.get('body_text', '')}")
+        if words < DEDUP_MIN_WORDS:
+            fingerprint = None
+        email_id = context.get('email_id', '')
+        if not email_id:
+            # Without an ID, blocks of different emails would count as one email and never match
+            self.stats['skipped_no_id'] += 1
+            return None
+        if not link and fingerprint is None:
+            return None
+
+        now = time.time()
+        sent_at = parse_sent_at(context.get('date_sent', ''))
+        if sent_at is None:
+            sent_at = now
+        with self._lock:
+            self.stats['lookups'] += 1
+            self._sync(now)
+            self._expire(now)
+            first = self.find(link, fingerprint, email_id, sent_at)
+            if first is not None:
+                return {field: first[field] for field in ('email_id', 'source', 'title', 'link', 'seen_at')}
+
+            entry = {
+                "key": f"{email_id}|{link}|{fingerprint}",
+                "email_id": email_id,
+                "source": context.get('processor', ''),
+                "title": block.get('title', ''),
+                "link": link,
+                "fingerprint": fingerprint,
+                "seen_at": sent_at,
+                "added_at": now,
+            }
+            added = self._add(entry)
+            if added:
+                self.stats['added'] += 1
+            # Once the store holds more expired entries than live ones, rewrite it
+            needs_compaction = self._expired_since_compaction > max(len(self.entries), 1000)
+
+        if added and self.store is not None:
+            try:
+                self.store.append(entry)
+            except Exception as e:
+                logger.warning(f"Dedup index store write failed: {e}")
+                self.stats['store_errors'] += 1
+        if needs_compaction:
+            self.compact()
+        return None
+
+    def compact(self):
+        """Drop expired entries from the shared store."""
+        if self.store is None:
+            return
+        now = time.time()
+        try:
+            unread = self.store.compact(now - self.window_seconds)
+        except Exception as e:
+            logger.warning(f"Dedup index compaction failed: {e}")
+            self.stats['store_errors'] += 1
+            unread = []
+        with self._lock:
+            for entry in unread:
+                self._add(entry)
+            self._expire(now)
+            self._expired_since_compaction = 0
+
+    def report(self) -> Dict:
+        return {
+            **self.stats,
+            "store": type(self.store).__name__ if self.store is not None else None,
+            "entries": len(self.entries),
+            "links": len(self.by_link),
+            "window_hours": self.window_seconds / 3600,
+            "max_distance": self.max_distance,
+            "mode": DEDUP_MODE,
+        }
+
+_dedup_index: Optional[DedupIndex] = None
+_dedup_index_lock = threading.Lock()
+
+def get_dedup_index() -> DedupIndex:
+    """Return the process-wide index, loading the shared store on first use."""
+    global _dedup_index
+    with _dedup_index_lock:
+        if _dedup_index is None:
+            _dedup_index = _create_dedup_index()
+    return _dedup_index
+
+def _create_dedup_index() -> DedupIndex:
+    store = None
+    try:
+        if DEDUP_REDIS_URL:
+            store = RedisStore(DEDUP_REDIS_URL)
+        elif DEDUP_INDEX_PATH:
+            store = FileStore(DEDUP_INDEX_PATH)
+    except Exception as e:
+        logger.warning(f"Dedup index store unavailable, using in-process index only: {e}")
+    index = DedupIndex(store)
+    index._sync(time.time())
+    logger.info(f"Dedup index loaded {len(index.entries)} entries")
+    return index
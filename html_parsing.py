@@ -0,0 +1,120 @@
+import os
+import re
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterator
+from bs4 import BeautifulSoup, SoupStrainer
+
+from metrics import observe_parse
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# 'html.parser' is the reference: it reproduces the pre-lxml outputs in fixtures/golden (tests/test_golden.py).
+# 'lxml' is the fast C tree builder, but repairs malformed markup differently (a <div> inside
+# a <p> ends the paragraph), so only opt in once it matches the goldens for your senders.
+PARSER_BACKEND = os.environ.get('HTML_PARSER_BACKEND', 'html.parser')
+FALLBACK_BACKEND = 'html.parser'
+
+# Set to 0 to always build the full tree, ignoring processor parse regions
+PARTIAL_PARSING = os.environ.get('PARTIAL_PARSING', '1') != '0'
+
+# Set to 0 to parse the HTML exactly as received
+STRIP_NOISE = os.environ.get('STRIP_NOISE', '1') != '0'
+
+# Never extracted: scripts, styles and comments (including Outlook conditional comments)
+NOISE_OPEN = re.compile(r'<(?:(script|style|noscript)\b|!--)', re.IGNORECASE)
+NOISE_CLOSE = {name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in ('script', 'style', 'noscript')}
+# [^<>] rather than [^>]: an unterminated <img can't make every later match scan to the end
+IMG_TAG = re.compile(r'<img\b[^<>]*>', re.IGNORECASE)
+PIXEL_DIMENSION = re.compile(r'\b(width|height)\s*=\s*["\']?\s*([01])(?:px)?\s*["\']?(?=[\s/>])', re.IGNORECASE)
+
+def _drop_pixel(match: re.Match) -> str:
+    tag = match.group()
+    return '' if len({name.lower() for name, _ in PIXEL_DIMENSION.findall(tag)}) == 2 else tag
+
+def _strip_noise_elements(content_html: str) -> str:
+    """
+    Drop script/style/noscript elements and comments in one forward scan. Each opening is
+    matched once; at the first one that is never closed the rest is kept as is (the parser
+    treats it as raw text or a comment anyway), so unclosed tags can't make this quadratic.
+    """
+    pieces = []
+    position = 0
+    while True:
+        match = NOISE_OPEN.search(content_html, position)
+        if match is None:
+            break
+        name = match.group(1)
+        if name is None:
+            end = content_html.find('-->', match.end())
+            if end == -1:
+                break
+            end += 3
+        else:
+            tag_end = content_html.find('>', match.end())
+            close = NOISE_CLOSE[name.lower()].search(content_html, tag_end + 1) if tag_end != -1 else None
+            if close is None:
+                break
+            end = close.end()
+        pieces.append(content_html[position:match.start()])
+        position = end
+    if not pieces:
+        return content_html
+    pieces.append(content_html[position:])
+    return ''.join(pieces)
+
+def strip_noise(content_html: str) -> str:
+    """Remove content no processor uses before parsing: it would only grow the tree."""
+    return IMG_TAG.sub(_drop_pixel, _strip_noise_elements(content_html))
+
+def _build(content_html: str, backend: str, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    if backend != FALLBACK_BACKEND:
+        try:
+            soup = BeautifulSoup(content_html, backend, parse_only=parse_only)
+            if soup.find() is not None or parse_only is not None or '<' not in content_html:
+                return soup
+            logger.warning(f"{backend} produced an empty tree, falling back to {FALLBACK_BACKEND}")
+        except Exception as e:
+            logger.warning(f"{backend} parse failed ({e}), falling back to {FALLBACK_BACKEND}")
+
+    return BeautifulSoup(content_html, FALLBACK_BACKEND, parse_only=parse_only)
+
+def parse_html(content_html: str, backend: str = None, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    """
+    Parse newsletter HTML with the configured backend.
+    Falls back to html.parser when lxml is unavailable or chokes on malformed input.
+    Scripts, styles, comments and 1x1 tracking pixels are stripped first (STRIP_NOISE).
+
+    When parse_only is given, only the matching region of the document is built.
+    If that region isn't present, the full document is parsed instead.
+    """
+    start = time.perf_counter()
+    backend = backend or PARSER_BACKEND
+    if STRIP_NOISE:
+        content_html = strip_noise(content_html)
+    if parse_only is not None and PARTIAL_PARSING:
+        soup = _build(content_html, backend, parse_only)
+        if soup.find() is not None:
+            observe_parse(time.perf_counter() - start)
+            return soup
+        logger.debug("Parse region not found, falling back to a full parse")
+
+    soup = _build(content_html, backend)
+    observe_parse(time.perf_counter() - start)
+    return soup
+
+@contextmanager
+def parsed_html(content_html: str, backend: str = None, parse_only: SoupStrainer = None) -> Iterator[BeautifulSoup]:
+    """
+    parse_html for the duration of a with block, then decompose the tree so its memory
+    is released at once rather than whenever the request's references go away.
+    Extract plain strings inside the block; tags and NavigableStrings don't outlive it.
+    """
+    soup = parse_html(content_html, backend, parse_only)
+    try:
+        yield soup
+    finally:
+        soup.decompose()
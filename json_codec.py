@@ -0,0 +1,56 @@
+"""
+JSON for request bodies, responses, cached results and archives.
+
+Uses orjson when it's installed (several times faster on large results) and the stdlib
+json module otherwise, or when JSON_BACKEND=stdlib. Input or output orjson refuses
+(lone surrogates, integers over 64 bits) falls back to the stdlib instead of failing.
+"""
+import os
+import json
+import uuid
+import decimal
+import logging
+import datetime
+from typing import Any, Union
+
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson')
+USE_ORJSON = orjson is not None and JSON_BACKEND == 'orjson'
+if JSON_BACKEND == 'orjson' and orjson is None:
+    logger.info("orjson is not installed, using the stdlib json module")
+
+def _default(obj: Any) -> Any:
+    """Types the stdlib encoder doesn't handle (orjson does dates and UUIDs itself)."""
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def loads(data: Union[bytes, str]) -> Any:
+    if USE_ORJSON:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # The stdlib is more lenient (lone surrogate escapes, NaN); only invalid JSON fails both
+            pass
+    return json.loads(data)
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON."""
+    if USE_ORJSON:
+        try:
+            return orjson.dumps(obj, default=_default,
+                                option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,94 @@
+import os
+import json
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+# LOG_LEVEL: root level (DEBUG logs every extractor step, INFO is one line per request)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# LOG_FORMAT: 'json' (one object per line, request metadata as fields) or 'text'
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+# LOG_SAMPLE_RATE: fraction of DEBUG/INFO records kept; warnings and errors are always kept
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+# LOG_QUEUE=1: handlers enqueue records and a background thread does the formatting and writing
+LOG_QUEUE = os.environ.get('LOG_QUEUE', '0') == '1'
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+_configured = False
+_lock = threading.Lock()
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; anything passed via extra= becomes a top-level field."""
+
+    _RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep a random fraction of records below WARNING."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+def _start_listener(handler: logging.Handler) -> None:
+    global _listener
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+
+def _restart_listener_after_fork() -> None:
+    # The listener thread doesn't survive fork (gunicorn --preload, the batch process pool),
+    # so each child gets a fresh queue and its own thread
+    if _listener is not None:
+        _queue_handler.queue = queue.SimpleQueue()
+        _start_listener(_listener.handlers[0])
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+def configure_logging() -> None:
+    """Configure the root logger from the LOG_* settings, once per process."""
+    global _configured, _queue_handler
+    with _lock:
+        if _configured:
+            return
+        _configured = True
+
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        if LOG_QUEUE:
+            _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+            _start_listener(handler)
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
+            atexit.register(_stop_listener)
+            handler = _queue_handler
+        if LOG_SAMPLE_RATE < 1.0:
+            handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+        root.addHandler(handler)
@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# With several gunicorn workers, point this at a shared empty directory so /metrics
+# aggregates every worker (and batch pool process) instead of whichever one answered
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PAYLOAD_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+STAGE_SECONDS = Histogram(
+    'newsletter_stage_seconds',
+    "Time spent in each stage of processing one email",
+    ['stage', 'processor'],
+    buckets=STAGE_BUCKETS,
+)
+REQUESTS = Counter(
+    'newsletter_http_requests_total',
+    "HTTP requests handled",
+    ['endpoint', 'method', 'status'],
+)
+ERRORS = Counter(
+    'newsletter_http_errors_total',
+    "HTTP responses with a 4xx/5xx status",
+    ['endpoint', 'status'],
+)
+REQUEST_SECONDS = Histogram(
+    'newsletter_http_request_seconds',
+    "Wall time per HTTP request",
+    ['endpoint'],
+    buckets=STAGE_BUCKETS,
+)
+PAYLOAD_BYTES = Histogram(
+    'newsletter_request_payload_bytes',
+    "Request body size",
+    ['endpoint'],
+    buckets=PAYLOAD_BUCKETS,
+)
+TRANSLATION_EVENTS = Counter(
+    'newsletter_translation_events_total',
+    "Translation API requests, segments and characters sent, retries, failures and fallbacks",
+    ['event'],
+)
+
+# Per-email state for the stage currently running: the processor name (used as the label
+# for parse/serialize timings recorded outside process_email) and the parse time so far
+_current: ContextVar[Optional[Dict]] = ContextVar('newsletter_stage_context', default=None)
+
+def start_email(processor: str = 'unknown') -> Dict:
+    """
+    Begin timing a new email. Parse/serialize observations made afterwards in this context
+    are labelled with state["processor"], which the caller fills in once it's resolved.
+    """
+    state = {"processor": processor, "parse": 0.0}
+    _current.set(state)
+    return state
+
+def current_processor() -> str:
+    state = _current.get()
+    return state["processor"] if state else 'unknown'
+
+# labels() takes a lock and builds a key on every call; the label set is small, so keep the children
+_stage_children: Dict[Tuple[str, str], Histogram] = {}
+
+def observe_stage(stage: str, seconds: float, processor: Optional[str] = None) -> None:
+    key = (stage, processor or current_processor())
+    child = _stage_children.get(key)
+    if child is None:
+        child = _stage_children[key] = STAGE_SECONDS.labels(*key)
+    child.observe(seconds)
+
+def observe_parse(seconds: float) -> None:
+    """Record a parse; the time is also credited to the email so it can be split from extraction."""
+    state = _current.get()
+    if state is not None:
+        state["parse"] += seconds
+    observe_stage('parse', seconds)
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float, payload_bytes: Optional[int]) -> None:
+    REQUESTS.labels(endpoint, method, str(status)).inc()
+    if status >= 400:
+        ERRORS.labels(endpoint, str(status)).inc()
+    REQUEST_SECONDS.labels(endpoint).observe(seconds)
+    if payload_bytes is not None:
+        PAYLOAD_BYTES.labels(endpoint).observe(payload_bytes)
+
+_translation_children: Dict[str, Counter] = {}
+
+def count_translation(event: str, amount: int = 1) -> None:
+    child = _translation_children.get(event)
+    if child is None:
+        child = _translation_children[event] = TRANSLATION_EVENTS.labels(event)
+    child.inc(amount)
+
+@contextmanager
+def timed_stage(stage: str, processor: Optional[str] = None) -> Iterator[None]:
+    """Record the wrapped block as one observation of stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, processor)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition of every metric, aggregated across processes in multiprocess mode."""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,47 +1,136 @@
+import os
 import re
+from functools import lru_cache
 from typing import List, Dict
 import json
-import html2text
 import logging
+from logging_config import configure_logging
 
-logging.basicConfig(level=logging.DEBUG)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Load categories and advertising keywords from a JSON file
-with open('newsletter_config.json', 'r') as config_file:
-    config = json.load(config_file)
-    CATEGORIES = config['categories']
-    AD_KEYWORDS = config['ad_keywords']
+CONFIG_PATH = os.environ.get(
+    'NEWSLETTER_CONFIG_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'newsletter_config.json'))
 
-logger.debug(f"Loaded categories: {CATEGORIES}")
+@lru_cache(maxsize=None)
+def get_config() -> Dict:
+    """Load categories, advertising keywords, routing and pipelines from the JSON config on first use."""
+    with open(CONFIG_PATH, 'r') as config_file:
+        config = json.load(config_file)
+    logger.debug("Loaded %d categories and %d ad keywords", len(config['categories']), len(config['ad_keywords']))
+    return config
 
-def is_advertisement(content_block):
-    text = content_block.get('body_text', '').lower()
-    title = content_block.get('title', '').lower()
+def __getattr__(name):
+    # CATEGORIES and AD_KEYWORDS stay importable, but the config is only read when they're used
+    if name == 'CATEGORIES':
+        return get_config()['categories']
+    if name == 'AD_KEYWORDS':
+        return get_config()['ad_keywords']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    # Check for exact matches of ad keywords
-    for keyword in AD_KEYWORDS:
-        if keyword.lower() in text or keyword.lower() in title:
-            return True
+# Blocks with a longer body are editorial; only their title can mark them as an ad
+AD_MAX_BODY_WORDS = int(os.environ.get('AD_MAX_BODY_WORDS', 120))
+
+# Promotional language patterns that mark a block as an ad.
+# Matched against lowercased text, so keep them lowercase.
+PROMO_PATTERNS = [
+    r"\d+% off",
+    r"sign up and get",
+    r"how it's done:",
+    r"answer a few questions",
+    r"get matched",
+    r"connect with .+ therapists?",
+    r"helping millions",
+    r"lead happier, healthier lives",
+    r"in as little as \d+ hours",
+]
+
+def trie_regex(words: List[str]) -> str:
+    """
+    Build a regex alternation factored by common prefixes, e.g. ['sale', 'save'] -> 'sa(?:le|ve)'.
+    The regex engine then walks it like a trie instead of retrying every word at each position.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+def _ends_on_word_boundary(keyword: str, prefix: str) -> bool:
+    """Whether prefix, as the start of keyword, ends where a word does (so '\\b' holds after it)."""
+    if len(prefix) == len(keyword):
+        return True
+    return re.match(r'\w', prefix[-1]) is None or re.match(r'\w', keyword[len(prefix)]) is None
 
-    # Check for promotional language patterns
-    promo_patterns = [
-        r"\d+% off",
-        r"sign up and get",
-        r"how it's done:",
-        r"answer a few questions",
-        r"get matched",
-        r"connect with .+ therapists?",
-        r"helping millions",
-        r"lead happier, healthier lives",
-        r"in as little as \d+ hours",
-    ]
-
-    for pattern in promo_patterns:
-        if re.search(pattern, text, re.IGNORECASE) or re.search(pattern, title, re.IGNORECASE):
+class AdMatcher:
+    """
+    Ad keywords and promo patterns compiled into one regex over lowercased text,
+    so a block is checked with a single scan instead of one pass per keyword.
+    Keywords only match whole words: 'sale' flags "summer sale", not "sales" or "wholesale".
+    The body is only scanned for short blocks, so an essay that mentions an agenda or a
+    conference isn't dropped as an ad.
+    """
+
+    def __init__(self, keywords: List[str], patterns: List[str], max_body_words: int = AD_MAX_BODY_WORDS):
+        self.max_body_words = max_body_words
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword})
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        keyword_regex = rf'\b(?:{trie_regex(self.keywords)})\b' if self.keywords else None
+        alternatives = ([keyword_regex] if keyword_regex else []) + list(patterns)
+        self.combined = re.compile('|'.join(f'(?:{alternative})' for alternative in alternatives)) if alternatives else None
+        # Lookahead finds a keyword at every position; the greedy trie yields the longest,
+        # and shorter keywords that are whole-word prefixes of it are credited from keyword_prefixes
+        self.keyword_scanner = re.compile(rf'(?=\b({trie_regex(self.keywords)})\b)') if self.keywords else None
+        self.keyword_prefixes = {
+            k: [other for other in self.keywords if k.startswith(other) and _ends_on_word_boundary(k, other)]
+            for k in self.keywords
+        }
+
+    @staticmethod
+    def _text(content_block: Dict) -> str:
+        # Newline keeps matches from spanning title and body; '.' in the patterns doesn't cross it
+        return f"{content_block.get('title', '')}\n{content_block.get('body_text', '')}".lower()
+
+    def matches(self, content_block: Dict) -> bool:
+        if self.combined is None:
+            return False
+        if self.combined.search(content_block.get('title', '').lower()) is not None:
             return True
+        body = content_block.get('body_text', '')
+        # maxsplit keeps counting cheap on long bodies: only whether it's over the limit matters
+        if len(body.split(maxsplit=self.max_body_words)) > self.max_body_words:
+            return False
+        return self.combined.search(body.lower()) is not None
+
+    def hits(self, content_block: Dict) -> Dict[str, List[str]]:
+        """Report which keywords and promo patterns appear anywhere in the block, for tuning the lists."""
+        text = self._text(content_block)
+        keywords = set()
+        if self.keyword_scanner is not None:
+            for match in self.keyword_scanner.finditer(text):
+                keywords.update(self.keyword_prefixes.get(match.group(1), ()))
+        patterns = [pattern.pattern for pattern in self.patterns if pattern.search(text)]
+        return {"keywords": sorted(keywords), "patterns": patterns}
+
+@lru_cache(maxsize=None)
+def get_ad_matcher() -> AdMatcher:
+    return AdMatcher(get_config()['ad_keywords'], PROMO_PATTERNS)
+
+def is_advertisement(content_block):
+    return get_ad_matcher().matches(content_block)
 
-    return False
+def advertisement_hits(content_block: Dict) -> Dict[str, List[str]]:
+    return get_ad_matcher().hits(content_block)
 
 def process_content_block(content_block: Dict) -> Dict:
     if is_advertisement(content_block):
@@ -59,6 +148,7 @@ def process_content_block(content_block: Dict) -> Dict:
 
 def html_to_text(html_content: str) -> str:
     """Convert HTML content to plain text."""
+    import html2text
     h = html2text.HTML2Text()
     h.ignore_links = False
     return h.handle(html_content)
@@ -0,0 +1,157 @@
+import time
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from newsletter_utils import is_advertisement, get_config
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+DEFAULT_PIPELINE = ['normalize', 'ad_filter', 'dedupe']
+DEFAULT_TARGET_LANGUAGE = 'he'
+
+def normalize_blocks(blocks: Iterable[Dict], context: Dict) -> Iterator[Dict]:
+    """Map extractor output onto the response block shape."""
+    for block in blocks:
+        yield {
+            "title": block.get('title', ''),
+            "image_url": block.get('image_url', ''),
+            "body_text": block.get('body_text', ''),
+            "link": block.get('link_url', ''),
+            "credit": context.get('sender_name', '')
+        }
+
+def filter_ads(blocks: Iterable[Dict], context: Dict) -> Iterator[Dict]:
+    for block in blocks:
+        if not is_advertisement(block):
+            yield block
+
+def dedupe_blocks(blocks: Iterable[Dict], context: Dict) -> Iterator[Dict]:
+    """Drop blocks repeated within one newsletter (same link, or same title and text)."""
+    seen = set()
+    for block in blocks:
+        link = block.get('link', '')
+        if link:
+            key = ('link', link)
+        else:
+            content = f"{block.get('title', '')}\n{block.get('body_text', '')}"
+            key = ('content', hashlib.sha1(content.encode('utf-8')).hexdigest())
+        if key in seen:
+            continue
+        seen.add(key)
+        yield block
+
+def cross_dedupe_blocks(blocks: Iterable[Dict], context: Dict) -> Iterator[Dict]:
+    """
+    Flag blocks already seen in another newsletter within the dedup window with a
+    duplicate_of pointer to the first occurrence (or drop them with DEDUP_MODE=drop).
+    """
+    # Imported here so processes without this stage never open the index
+    from dedup_index import get_dedup_index, DEDUP_ENABLED, DEDUP_MODE
+    if not DEDUP_ENABLED:
+        yield from blocks
+        return
+    index = get_dedup_index()
+    for block in blocks:
+        first = index.check(block, context)
+        if first is None:
+            yield block
+        elif DEDUP_MODE != 'drop':
+            yield {**block, "duplicate_of": first}
+
+def categorize_blocks(blocks: Iterable[Dict], context: Dict) -> Iterator[Dict]:
+    """Tag blocks with taxonomy categories; collects the newsletter first so it's scored in one multiply."""
+    # Imported here so the model (and scikit-learn) only load in processes that categorize
+    from categorizer import assign_categories
+    yield from assign_categories(list(blocks))
+
+def summarize_blocks(blocks: Iterable[Dict], context: Dict) -> Iterator[Dict]:
+    """Add an extractive 'summary' to blocks whose body is long enough to need one."""
+    # Imported here so numpy/scipy only load in processes that summarize
+    from summarizer import summarize
+    for block in blocks:
+        summary = summarize(block.get('body_text', ''))
+        yield {**block, "summary": summary} if summary else block
+
+def translate_blocks(blocks: Iterable[Dict], context: Dict) -> Iterator[Dict]:
+    """Translate title and body of every block; collects the newsletter first so requests are batched."""
+    # Imported here to keep translation dependencies out of startup
+    from translator import translate_content_blocks
+    target_language = context.get('target_language', DEFAULT_TARGET_LANGUAGE)
+    yield from translate_content_blocks(list(blocks), target_language, fields=('title', 'body_text'))
+
+STAGES: Dict[str, Callable] = {
+    'normalize': normalize_blocks,
+    'ad_filter': filter_ads,
+    'dedupe': dedupe_blocks,
+    'cross_dedupe': cross_dedupe_blocks,
+    'categorize': categorize_blocks,
+    'summarize': summarize_blocks,
+    'translate': translate_blocks,
+}
+
+@lru_cache(maxsize=None)
+def get_pipelines() -> Dict[str, List[str]]:
+    """
+    Per-processor stage lists from the 'pipelines' section of the config, read on first use.
+    'default' applies to processors without their own entry.
+    """
+    pipelines = {'default': DEFAULT_PIPELINE, **get_config().get('pipelines', {})}
+    for processor, stages in pipelines.items():
+        unknown = [stage for stage in stages if stage not in STAGES]
+        if unknown:
+            raise ValueError(f"Unknown post-processing stages for {processor}: {unknown}")
+    return pipelines
+
+def pipeline_for(processor: str) -> List[str]:
+    pipelines = get_pipelines()
+    return pipelines.get(processor, pipelines['default'])
+
+class _StageTimer:
+    """Counts blocks out of a stage and the time spent producing them (including upstream)."""
+
+    def __init__(self, name: str, stage: Iterator[Dict]):
+        self.name = name
+        self.stage = stage
+        self.count = 0
+        self.seconds = 0.0
+
+    def __iter__(self):
+        while True:
+            start = time.perf_counter()
+            try:
+                block = next(self.stage)
+            except StopIteration:
+                self.seconds += time.perf_counter() - start
+                return
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            yield block
+
+def run_pipeline(blocks: Iterable[Dict], stages: List[str], context: Dict) -> Tuple[List[Dict], Dict]:
+    """
+    Chain the named stages as generators so blocks stream through without
+    intermediate lists. Returns the surviving blocks and per-stage counts/timings.
+    """
+    source = _StageTimer('input', iter(blocks))
+    timers = [source]
+    stream = iter(source)
+    for name in stages:
+        timer = _StageTimer(name, STAGES[name](stream, context))
+        timers.append(timer)
+        stream = iter(timer)
+
+    output = list(stream)
+
+    stats = []
+    for upstream, timer in zip(timers, timers[1:]):
+        stats.append({
+            "stage": timer.name,
+            "blocks_in": upstream.count,
+            "blocks_out": timer.count,
+            "seconds": round(max(timer.seconds - upstream.seconds, 0.0), 6),
+        })
+    return output, {"stages": stats}
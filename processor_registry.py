@@ -0,0 +1,160 @@
+import re
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+RULE_TYPES = ('exact', 'domain', 'substring', 'regex')
+RULE_FIELDS = ('sender_email', 'sender_name')
+
+def email_domain(sender_email: str) -> str:
+    """Return the lowercased domain of an address, tolerating 'Name <a@b.com>' forms."""
+    if '@' not in sender_email:
+        return ''
+    return sender_email.rpartition('@')[2].strip().rstrip('>').lower()
+
+class LiteralMatcher:
+    """
+    Finds every literal occurring in a text with a single compiled regex scan.
+    Literals are tried longest-first at each position; shorter literals that are
+    prefixes of the matched one are credited too, so no occurrence is missed.
+    """
+
+    def __init__(self, literals: List[str]):
+        self.literals = sorted(set(literals), key=len, reverse=True)
+        self.pattern = None
+        self.prefixes = {}
+        if self.literals:
+            alternation = '|'.join(re.escape(literal) for literal in self.literals)
+            self.pattern = re.compile(f'(?=({alternation}))')
+            self.prefixes = {
+                literal: [other for other in self.literals if literal.startswith(other)]
+                for literal in self.literals
+            }
+
+    def find_all(self, text: str) -> set:
+        found = set()
+        if self.pattern is None or not text:
+            return found
+        for match in self.pattern.finditer(text):
+            found.update(self.prefixes[match.group(1)])
+        return found
+
+class ProcessorRegistry:
+    """
+    Routes a sender to a processor function.
+
+    Each route names a processor and up to one rule per field (sender_email,
+    sender_name); every rule on a route must match. Routes are tried in
+    registration order and the first fully matching one wins. Rules are compiled
+    into per-field indexes (exact hash, domain-suffix hash, one literal matcher
+    for all substring rules) so lookups don't scan every route.
+    """
+
+    def __init__(self, default: Optional[str] = None, route_loader: Optional[Callable[[], List[Dict]]] = None):
+        self.processors: Dict[str, Callable] = {}
+        self.routes: List[Dict] = []
+        self.default = default
+        # Called once, on first compile, for routes kept outside the code (e.g. the JSON config)
+        self.route_loader = route_loader
+        self._index = None
+        self._lock = threading.Lock()
+
+    def register_processor(self, name: str, function: Callable) -> Callable:
+        self.processors[name] = function
+        return function
+
+    def add_route(self, processor: str, sender_email: Dict = None, sender_name: Dict = None, source: str = 'code'):
+        """
+        Add a route. Rules are dicts like {"type": "substring", "value": "adweek"}.
+        """
+        rules = {}
+        for field, rule in (('sender_email', sender_email), ('sender_name', sender_name)):
+            if rule is None:
+                continue
+            if rule.get('type') not in RULE_TYPES:
+                raise ValueError(f"Unknown rule type for {processor}: {rule.get('type')}")
+            if rule['type'] == 'domain' and field != 'sender_email':
+                raise ValueError(f"Domain rules only apply to sender_email ({processor})")
+            value = rule['value'] if rule['type'] == 'regex' else rule['value'].lower()
+            rules[field] = {"type": rule['type'], "value": value}
+        if not rules:
+            raise ValueError(f"Route for {processor} needs at least one rule")
+
+        self.routes.append({"processor": processor, "rules": rules, "source": source})
+        self._index = None
+
+    def load_routes(self, routes: List[Dict], source: str = 'config'):
+        """Append routes given in the same shape as the 'routing' list of newsletter_config.json."""
+        for route in routes:
+            self.add_route(route['processor'], route.get('sender_email'), route.get('sender_name'), source=source)
+        logger.debug("Loaded %d routes from %s", len(routes), source)
+
+    def compile(self):
+        with self._lock:
+            if self.route_loader is not None:
+                loader, self.route_loader = self.route_loader, None
+                self.load_routes(loader())
+            if self._index is None:
+                self._index = self._build_index()
+            return self._index
+
+    def _build_index(self):
+        index = {field: {"exact": {}, "domain": {}, "substring": {}, "regex": []} for field in RULE_FIELDS}
+
+        for position, route in enumerate(self.routes):
+            if route['processor'] not in self.processors:
+                raise ValueError(f"Route refers to unknown processor: {route['processor']}")
+            for field, rule in route['rules'].items():
+                field_index = index[field]
+                if rule['type'] == 'regex':
+                    field_index['regex'].append((re.compile(rule['value'], re.IGNORECASE), position))
+                else:
+                    field_index[rule['type']].setdefault(rule['value'], []).append(position)
+
+        for field_index in index.values():
+            field_index['matcher'] = LiteralMatcher(list(field_index['substring']))
+
+        return index
+
+    def _candidates(self, field: str, value: str) -> set:
+        field_index = self._index[field]
+        positions = set(field_index['exact'].get(value, ()))
+
+        domain = email_domain(value) if field == 'sender_email' and field_index['domain'] else ''
+        if domain:
+            labels = domain.split('.')
+            for i in range(len(labels)):
+                positions.update(field_index['domain'].get('.'.join(labels[i:]), ()))
+
+        for literal in field_index['matcher'].find_all(value):
+            positions.update(field_index['substring'][literal])
+
+        for pattern, position in field_index['regex']:
+            if pattern.search(value):
+                positions.add(position)
+
+        return positions
+
+    def resolve(self, sender_email: str, sender_name: str) -> Tuple[str, Optional[Dict]]:
+        """Return (processor name, matching route); the route is None for the default."""
+        if self._index is None or self.route_loader is not None:
+            self.compile()
+
+        values = {"sender_email": sender_email.lower(), "sender_name": sender_name.lower()}
+        matched = {field: self._candidates(field, value) for field, value in values.items()}
+
+        candidates = sorted(matched['sender_email'] | matched['sender_name'])
+        for position in candidates:
+            route = self.routes[position]
+            if all(position in matched[field] for field in route['rules']):
+                return route['processor'], route
+
+        return self.default, None
+
+    def get_processor(self, sender_email: str, sender_name: str) -> Callable:
+        name, _ = self.resolve(sender_email, sender_name)
+        return self.processors[name]
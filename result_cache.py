@@ -0,0 +1,129 @@
+import os
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from cachetools import TTLCache
+import json_codec
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', '1') != '0'
+RESULT_CACHE_MAXSIZE = int(os.environ.get('RESULT_CACHE_MAXSIZE', 512))
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 86400))
+# Results larger than this (serialized bytes) are kept out of Redis
+RESULT_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('RESULT_CACHE_MAX_ENTRY_BYTES', 2 * 1024 * 1024))
+# Empty disables the shared tier. Entries are only bounded by their TTL, so this must be a Redis
+# that evicts (allkeys-lru), never the Celery broker, which runs with noeviction
+RESULT_CACHE_REDIS_URL = os.environ.get('RESULT_CACHE_REDIS_URL', '')
+# Include message-id in the key, so identical HTML sent as separate emails is processed separately
+RESULT_CACHE_KEY_EMAIL_ID = os.environ.get('RESULT_CACHE_KEY_EMAIL_ID', '0') == '1'
+# After a Redis error, skip the shared tier for this many seconds instead of timing out on every request
+REDIS_RETRY_AFTER = 30
+
+class ResultCache:
+    """
+    Processed-newsletter cache with an in-process TTL/LRU tier in front of an optional Redis tier.
+    Keys include the processor version, so bumping it invalidates every old entry.
+    """
+
+    def __init__(self, version: str, maxsize: int = RESULT_CACHE_MAXSIZE, ttl: int = RESULT_CACHE_TTL,
+                 redis_url: str = RESULT_CACHE_REDIS_URL, enabled: bool = RESULT_CACHE_ENABLED):
+        self.version = version
+        self.ttl = ttl
+        self.enabled = enabled
+        self.redis_url = redis_url
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._redis = None
+        self._redis_down_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "redis_errors": 0, "oversize": 0}
+
+    def key(self, content_html: str, processor: str, sender_name: str, stages, email_id: str = '') -> str:
+        digest = hashlib.sha256()
+        for part in (processor, sender_name, ','.join(stages), email_id if RESULT_CACHE_KEY_EMAIL_ID else ''):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(content_html.encode('utf-8'))
+        return f"newsletter-result:{self.version}:{digest.hexdigest()}"
+
+    def _get_redis(self):
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis
+
+    def _redis_failed(self, error: Exception):
+        logger.warning(f"Result cache Redis error, skipping Redis for {REDIS_RETRY_AFTER}s: {error}")
+        self.stats['redis_errors'] += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            value = self.local.get(key)
+            if value is not None:
+                self.stats['local_hits'] += 1
+                return value
+
+        try:
+            client = self._get_redis()
+            raw = client.get(key) if client is not None else None
+        except Exception as e:
+            self._redis_failed(e)
+            raw = None
+
+        if raw is not None:
+            value = json_codec.loads(raw)
+            with self._lock:
+                self.local[key] = value
+                self.stats['redis_hits'] += 1
+            return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key: str, value: Dict):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.local[key] = value
+            self.stats['stores'] += 1
+
+        try:
+            client = self._get_redis()
+            if client is None:
+                return
+            raw = json_codec.dumps(value)
+            if len(raw) > RESULT_CACHE_MAX_ENTRY_BYTES:
+                self.stats['oversize'] += 1
+                return
+            client.setex(key, self.ttl, raw)
+        except Exception as e:
+            self._redis_failed(e)
+
+    def clear(self):
+        with self._lock:
+            self.local.clear()
+
+    def report(self) -> Dict:
+        lookups = self.stats['local_hits'] + self.stats['redis_hits'] + self.stats['misses']
+        hits = self.stats['local_hits'] + self.stats['redis_hits']
+        return {
+            **self.stats,
+            "version": self.version,
+            "enabled": self.enabled,
+            "redis_enabled": bool(self.redis_url),
+            "local_entries": len(self.local),
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,225 @@
+"""
+Synthetic newsletter emails that mimic the layout each processor expects.
+Used by benchmark.py for parser parity checks and timing.
+
+Write a fixture corpus to disk (one request payload per file):
+    python sample_corpus.py --out fixtures/ --stories 1 10 100 500 --sizes 10KB 1MB 5MB
+"""
+import os
+import re
+import json
+import random
+import argparse
+from typing import Dict, List, Tuple
+
+WORDS = ("brand agency campaign creative launch audience media platform growth strategy "
+         "marketing design budget client story insight culture product market digital "
+         "retail streaming advertising revenue team leadership customer data").split()
+
+SOURCES = {
+    'axios': ('sara@axios.com', 'Sara Fischer'),
+    'no_mercy_no_malice': ('nomercynomalice@mail.profgalloway.com', 'Scott Galloway'),
+    'seth_godin': ('notify@sethgodin.com', 'Seth Godin'),
+    'simon_sinek': ('inspireme@simonsinek.com', 'Simon Sinek'),
+    'hbr_management_tip': ('emailteam@emails.hbr.org', 'Harvard Business Review'),
+    'dorie_clark': ('dorie@dorieclark.com', 'Dorie Clark'),
+    'adweek': ('newsletters@adweek.com', 'Adweek'),
+    'campaign_brief': ('info@campaignbrief.com', 'Campaign Brief'),
+    'creative_bloq': ('newsletter@creativebloq.com', 'Creative Bloq'),
+    'generic': ('hello@example.com', 'Example Weekly'),
+}
+
+def _sentence(rng: random.Random, length: int = 14) -> str:
+    words = [rng.choice(WORDS) for _ in range(length)]
+    return " ".join(words).capitalize() + "."
+
+def _paragraph(rng: random.Random, sentences: int = 4) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+def _axios(rng, stories):
+    parts = ['<span class="bodytext hed">Today\'s Media Trends</span>']
+    for i in range(stories):
+        parts.append(
+            f'<span class="bodytext hed">{_sentence(rng, 6)}</span>'
+            f'<table><tr><td class="post-text"><p>{_paragraph(rng)}</p><p>{_paragraph(rng)}</p>'
+            f'<a href="https://www.axios.com/story/{i}">Go deeper</a>'
+            f'<img src="https://images.axios.com/{i}.png"></td></tr></table>'
+        )
+    return "".join(parts)
+
+def _no_mercy_no_malice(rng, stories):
+    cells = [f'<td class="dd"><p>{_sentence(rng, 5)}</p></td>']
+    for i in range(stories):
+        cells.append(f'<td class="dd"><p>{_paragraph(rng)}</p><img src="https://img.profgalloway.com/{i}.png">'
+                     f'<a href="https://www.profgalloway.com/{i}">link</a></td>')
+    cells.append('<td class="dd"><p>P.S. Join our next workshop.</p></td>')
+    return f'<table><tr id="content-blocks">{"".join(cells)}</tr></table>'
+
+def _seth_godin(rng, stories):
+    paragraphs = "".join(f"<p>{_paragraph(rng)}</p>" for _ in range(stories))
+    return (f'<img class="c24" src="https://seths.blog/header.png">'
+            f'<div class="rssDesc"><h2>{_sentence(rng, 4)}</h2>{paragraphs}<p></p></div>')
+
+def _simon_sinek(rng, stories):
+    paragraphs = "".join(f"<p>{_paragraph(rng, 2)}</p>" for _ in range(stories))
+    return (f'<img class="stretch-on-mobile" src="https://simonsinek.com/header.png">'
+            f'<div id="hs_cos_wrapper_module-0-0-1_1234">{paragraphs}</div>')
+
+def _hbr_management_tip(rng, stories):
+    paragraphs = "".join(f"<p>{_paragraph(rng)}</p>" for _ in range(stories))
+    return (f'<table class="row-content stack"><tr><td><h1>{_sentence(rng, 5)}</h1>'
+            f'<div style="font-family:Georgia,Times,\'Times New Roman\',serif;font-size:16px">{paragraphs}</div>'
+            f'<div style="font-family:Helvetica Neue,Helvetica,Arial,sans-serif;font-size:12px">'
+            f'Adapted from {_sentence(rng, 5)}</div></td></tr></table>')
+
+def _dorie_clark(rng, stories):
+    parts = []
+    for i in range(stories):
+        parts.append(f"<p>{_paragraph(rng)}</p>")
+        if i % 3 == 1:
+            parts.append(f"<ul><li>{_sentence(rng, 6)}</li><li>{_sentence(rng, 6)}</li></ul>")
+        if i == stories // 2:
+            parts.append(f"<p>***</p><p>{_sentence(rng)} Register now.</p><p>***</p>")
+    parts.append("<p>PS - Reply and tell me what you think.</p><p>Unsubscribe</p>")
+    return f'<div class="message-content">{"".join(parts)}</div>'
+
+def _adweek(rng, stories):
+    parts = []
+    for i in range(stories):
+        parts.append(
+            f'<table class="em_wrapper"><tr><td class="em_font_18">'
+            f'<a href="https://www.adweek.com/{i}">{_sentence(rng, 7)}</a></td></tr>'
+            f'<tr><td><img class="em_full_img" src="https://static.adweek.com/{i}.jpg"></td></tr>'
+            f'<tr><td class="em_font_15">{_paragraph(rng, 2)}</td></tr></table>'
+        )
+    return "".join(parts)
+
+def _campaign_brief(rng, stories):
+    parts = []
+    for i in range(stories):
+        parts.append(
+            f'<div style="text-align: left;color: #656565;min-width: 300px;">'
+            f'<img class="mc-rss-item-img" src="https://campaignbrief.com/{i}.jpg">'
+            f'<a style="font-family: \'Oswald\', sans-serif;" href="https://campaignbrief.com/{i}">{_sentence(rng, 7)}</a>'
+            f'<div id="rssContent">{_paragraph(rng, 2)}</div></div>'
+        )
+    return f'<table id="rssColumn"><tr><td>{"".join(parts)}</td></tr></table>'
+
+def _creative_bloq(rng, stories):
+    parts = []
+    for i in range(stories):
+        parts.append(
+            f'<table class="name-60"><tr><td>'
+            f'<div data-testid="copy_headline">{_sentence(rng, 7)}</div>'
+            f'<div class="name-100">{_paragraph(rng, 2)}</div>'
+            f'<a data-testid="cta_link" href="https://www.creativebloq.com/{i}">Read more</a>'
+            f'<img class="scale_full_width" src="https://cdn.creativebloq.com/{i}.jpg">'
+            f'</td></tr></table>'
+        )
+    return f'<table class="name-59"><tr><td>{"".join(parts)}</td></tr></table>'
+
+def _generic(rng, stories):
+    paragraphs = "".join(f"<p>{_paragraph(rng)}</p>" for _ in range(stories))
+    return (f'<h1>{_sentence(rng, 5)}</h1><img src="https://example.com/header.png">'
+            f'<a href="https://example.com/read">Read online</a><div class="content">{paragraphs}</div>')
+
+BUILDERS = {
+    'axios': _axios,
+    'no_mercy_no_malice': _no_mercy_no_malice,
+    'seth_godin': _seth_godin,
+    'simon_sinek': _simon_sinek,
+    'hbr_management_tip': _hbr_management_tip,
+    'dorie_clark': _dorie_clark,
+    'adweek': _adweek,
+    'campaign_brief': _campaign_brief,
+    'creative_bloq': _creative_bloq,
+    'generic': _generic,
+}
+
+def _noise(rng: random.Random, stories: int) -> Tuple[str, str]:
+    """Head CSS and per-story Outlook/tracking markup as sent by marketing email tools."""
+    rules = "".join(f".c{i}-{rng.randrange(1000)} {{ padding: {i % 9}px; font-family: Helvetica, Arial, sans-serif; "
+                    f"color: #{rng.randrange(0xffffff):06x}; }}\n" for i in range(400))
+    head = f'<style type="text/css">{rules}</style><!--[if mso]><style>table {{ border-collapse: collapse; }}</style><![endif]-->'
+    body = "".join(
+        f'<!--[if mso]><table width="600"><tr><td><![endif]--><script type="application/ld+json">{{"story": {i}}}</script>'
+        f'<img src="https://track.example.com/view/{i}.gif" width="1" height="1" alt=""><!--[if mso]></td></tr></table><![endif]-->'
+        for i in range(stories)
+    )
+    return head, body
+
+def build_html(source: str, stories: int = 10, seed: int = 0, noisy: bool = False) -> str:
+    """
+    Build a full HTML email for a source, wrapped in the usual head/footer noise.
+    noisy adds the heavier CSS, conditional comments, scripts and per-story pixels of real marketing email.
+    """
+    rng = random.Random(seed)
+    body = BUILDERS[source](rng, stories)
+    pixels = "".join(f'<img src="https://track.example.com/open/{n}.gif" width="1" height="1">' for n in range(5))
+    head = '<style>td { padding: 0; } .em_wrapper { width: 100%; }</style>'
+    if noisy:
+        extra_head, extra_body = _noise(rng, stories)
+        head, pixels = head + extra_head, extra_body + pixels
+    return (
+        f'<html><head>{head}</head>'
+        f'<body>{body}<table><tr><td>Unsubscribe | Manage preferences</td></tr></table>{pixels}</body></html>'
+    )
+
+def build_email(source: str, stories: int = 10, seed: int = 0, noisy: bool = False) -> Dict:
+    """Build a request payload in the shape /process_email expects."""
+    sender, sender_name = SOURCES[source]
+    return {
+        "metadata": {
+            "sender": sender,
+            "Sender name": sender_name,
+            "date": "2024-01-01T08:00:00Z",
+            "subject": f"{sender_name} newsletter #{seed}",
+            "message-id": f"<{source}-{stories}-{seed}@example.com>",
+            "content": {"html": build_html(source, stories, seed, noisy)},
+        }
+    }
+
+def build_corpus(stories: int = 10, seed: int = 0) -> List[Dict]:
+    """One email per known source."""
+    return [build_email(source, stories, seed) for source in SOURCES]
+
+def parse_size(size: str) -> int:
+    """'10KB', '1.5MB' or a plain byte count -> bytes."""
+    match = re.fullmatch(r'\s*([\d.]+)\s*(B|KB|MB)?\s*', size, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    factor = {'B': 1, 'KB': 1024, 'MB': 1024 * 1024}[(match.group(2) or 'B').upper()]
+    return int(float(match.group(1)) * factor)
+
+def stories_for_size(source: str, target_bytes: int, seed: int = 0, noisy: bool = False) -> int:
+    """Story count that brings a source's HTML close to target_bytes; layouts grow linearly per story."""
+    # Measure over several stories: some layouts add extras every few stories
+    base = len(build_html(source, 1, seed, noisy))
+    per_story = max((len(build_html(source, 31, seed, noisy)) - base) / 30, 1)
+    return max(1, round((target_bytes - base) / per_story) + 1)
+
+def build_email_of_size(source: str, target_bytes: int, seed: int = 0, noisy: bool = False) -> Dict:
+    return build_email(source, stories_for_size(source, target_bytes, seed, noisy), seed, noisy)
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic newsletter payloads as JSON fixtures")
+    parser.add_argument('--out', required=True, help="Directory to write *.json payloads into")
+    parser.add_argument('--stories', type=int, nargs='*', default=[1, 10, 100, 500])
+    parser.add_argument('--sizes', nargs='*', default=[], help="Target HTML sizes, e.g. 10KB 5MB")
+    parser.add_argument('--source', action='append', choices=sorted(SOURCES), help="Limit to these sources")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--noisy', action='store_true', help="Add heavy CSS, conditional comments, scripts and pixels")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for source in args.source or SOURCES:
+        emails = {f"{source}-{stories}-stories": build_email(source, stories, args.seed, args.noisy) for stories in args.stories}
+        for size in args.sizes:
+            emails[f"{source}-{size.lower()}"] = build_email_of_size(source, parse_size(size), args.seed, args.noisy)
+        for name, email in emails.items():
+            with open(os.path.join(args.out, f"{name}.json"), 'w') as f:
+                json.dump(email, f)
+            print(f"{name}: {len(email['metadata']['content']['html'])} bytes")
+
+if __name__ == "__main__":
+    main()
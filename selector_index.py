@@ -0,0 +1,241 @@
+import re
+import time
+import logging
+from bisect import bisect_right
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import soupsieve
+from bs4 import Tag
+
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+QUOTES = re.compile(r'["\']')
+COMMA = re.compile(r'\s*,\s*')
+WHITESPACE = re.compile(r'\s+')
+
+INDEX_KINDS = ('tag', 'class', 'id', 'testid', 'style')
+
+# Per-selector lookups since startup, for /selector-stats and the benchmark
+stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {"calls": 0, "hits": 0, "seconds": 0.0})
+
+def _record(name: str, hits: int, seconds: float) -> None:
+    entry = stats[name]
+    entry['calls'] += 1
+    entry['hits'] += hits
+    entry['seconds'] += seconds
+
+def _normalize_value(value: str) -> str:
+    return WHITESPACE.sub(' ', COMMA.sub(',', QUOTES.sub('', value))).strip().lower()
+
+@lru_cache(maxsize=4096)
+def parse_style(value: str) -> Dict[str, str]:
+    """
+    Inline style as {property: value}, lowercased, unquoted and with whitespace normalized,
+    so "font-family: 'Oswald', sans-serif" and "font-family:Oswald,sans-serif" compare equal.
+    Cached: emails repeat the same style strings, so treat the result as read-only.
+    """
+    declarations = {}
+    for declaration in value.split(';'):
+        name, colon, declared = declaration.partition(':')
+        if colon and name.strip():
+            declarations[name.strip().lower()] = _normalize_value(declared)
+    return declarations
+
+def _quote(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+class Selector:
+    """
+    An element query a processor declares once, at import time.
+
+    tag/class_/id/id_prefix/testid compile to a soupsieve CSS selector, used for one-off
+    lookups (select_one). Inside a SelectorIndex the same conditions are checked directly
+    against the indexed attributes, which is much cheaper per candidate than soupsieve.
+    style lists inline declarations the element must have, compared normalized and each
+    value as a prefix (so style="font-family: 'Oswald'" matches "font-family:Oswald, sans-serif").
+    """
+
+    def __init__(self, name: str, tag: Optional[str] = None, class_: Optional[str] = None, id: Optional[str] = None,
+                 id_prefix: Optional[str] = None, testid: Optional[str] = None, style: Optional[str] = None):
+        self.name = name
+        self.tag = tag
+        self.style = parse_style(style) if style else {}
+        classes = class_.split() if class_ else []
+        self.classes = frozenset(classes)
+        self.attrs = tuple((attr, value) for attr, value in (('id', id), ('data-testid', testid)) if value)
+        self.id_prefix = id_prefix
+
+        css = tag or '*'
+        css += "".join(f".{soupsieve.escape(token)}" for token in classes)
+        if id:
+            css += f"[id={_quote(id)}]"
+        if id_prefix:
+            css += f"[id^={_quote(id_prefix)}]"
+        if testid:
+            css += f"[data-testid={_quote(testid)}]"
+        if style:
+            css += "[style]"
+        self.css = css
+        self.pattern = soupsieve.compile(css)
+
+        # The index list to start from: the rarest attribute the selector names
+        if id:
+            self.key = ('id', id)
+        elif testid:
+            self.key = ('testid', testid)
+        elif classes:
+            self.key = ('class', classes[0])
+        elif self.style:
+            self.key = ('style', next(iter(self.style)))
+        elif tag:
+            self.key = ('tag', tag)
+        else:
+            self.key = None
+
+    def matches_style(self, style: Optional[Dict[str, str]]) -> bool:
+        if not self.style:
+            return True
+        if not style:
+            return False
+        return all(style.get(name, '').startswith(value) for name, value in self.style.items())
+
+    def matches(self, element: Tag, style: Optional[Dict[str, str]]) -> bool:
+        """The compiled CSS conditions, checked on an indexed element's attributes."""
+        if self.tag and element.name != self.tag:
+            return False
+        attrs = element.attrs
+        if self.classes:
+            classes = attrs.get('class') or ()
+            if not self.classes.issubset(classes.split() if isinstance(classes, str) else classes):
+                return False
+        for name, value in self.attrs:
+            if attrs.get(name) != value:
+                return False
+        if self.id_prefix and not (attrs.get('id') or '').startswith(self.id_prefix):
+            return False
+        return self.matches_style(style)
+
+    def select_one(self, root: Tag) -> Optional[Tag]:
+        """First match under root without an index: soupsieve stops at the first CSS match."""
+        start = time.perf_counter()
+        found = None
+        if not self.style:
+            found = self.pattern.select_one(root)
+        else:
+            for element in self.pattern.iselect(root):
+                if self.matches_style(parse_style(element['style'])):
+                    found = element
+                    break
+        _record(self.name, found is not None, time.perf_counter() - start)
+        return found
+
+    def __repr__(self) -> str:
+        return f"Selector({self.name!r}, {self.css!r}, style={self.style!r})"
+
+class SelectorIndex:
+    """
+    Elements of one parsed document (or subtree) indexed by tag, class token, id, data-testid
+    and style property in a single pass. Lookups then only test the candidates under one key,
+    and lookups within an element are a range of the same lists rather than another walk.
+    Like the soup it indexes, it must not outlive the parsed_html block.
+    """
+
+    def __init__(self, root: Tag):
+        start = time.perf_counter()
+        self.root = root
+        self.elements: List[Tag] = []
+        self.styles: List[Optional[Dict[str, str]]] = []
+        # Position of each element's last descendant, so "inside element i" is (i, ends[i]]
+        self.ends: List[int] = []
+        self.positions: Dict[int, int] = {}
+        # kind ('tag', 'class', 'id', 'testid', 'style') -> value -> positions, in document order
+        self.keys: Dict[str, Dict[str, List[int]]] = {kind: defaultdict(list) for kind in INDEX_KINDS}
+
+        elements, styles, ends, positions = self.elements, self.styles, self.ends, self.positions
+        by_tag, by_class, by_id, by_testid, by_style = (self.keys[kind] for kind in INDEX_KINDS)
+        open_elements: List[Tuple[Tag, int]] = []
+        for node in root.descendants:
+            if not isinstance(node, Tag):
+                continue
+            position = len(elements)
+            parent = node.parent
+            while open_elements and open_elements[-1][0] is not parent:
+                ends[open_elements.pop()[1]] = position - 1
+            open_elements.append((node, position))
+
+            elements.append(node)
+            ends.append(position)
+            positions[id(node)] = position
+            by_tag[node.name].append(position)
+
+            attrs = node.attrs
+            if attrs:
+                classes = attrs.get('class')
+                if classes:
+                    for token in classes.split() if isinstance(classes, str) else classes:
+                        by_class[token].append(position)
+                if 'id' in attrs:
+                    by_id[attrs['id']].append(position)
+                if 'data-testid' in attrs:
+                    by_testid[attrs['data-testid']].append(position)
+                style = attrs.get('style')
+                if style:
+                    style = parse_style(style)
+                    for name in style:
+                        by_style[name].append(position)
+                styles.append(style or None)
+            else:
+                styles.append(None)
+
+        for _, position in open_elements:
+            ends[position] = len(elements) - 1
+
+        _record('index', len(self.elements), time.perf_counter() - start)
+
+    def select(self, selector: Selector, within: Optional[Tag] = None, limit: Optional[int] = None) -> List[Tag]:
+        """Elements matching selector in document order, optionally only those inside within."""
+        start = time.perf_counter()
+        if selector.key:
+            kind, value = selector.key
+            candidates = self.keys[kind].get(value, [])
+        else:
+            candidates = range(len(self.elements))
+        low, high = 0, len(candidates)
+        if within is not None and within is not self.root:
+            position = self.positions.get(id(within))
+            if position is None:
+                raise ValueError(f"{within.name} element is not part of this index")
+            low = bisect_right(candidates, position)
+            high = bisect_right(candidates, self.ends[position])
+
+        found = []
+        for position in candidates[low:high]:
+            element = self.elements[position]
+            if selector.matches(element, self.styles[position]):
+                found.append(element)
+                if limit is not None and len(found) >= limit:
+                    break
+
+        _record(selector.name, len(found), time.perf_counter() - start)
+        return found
+
+    def select_one(self, selector: Selector, within: Optional[Tag] = None) -> Optional[Tag]:
+        found = self.select(selector, within, limit=1)
+        return found[0] if found else None
+
+def selector_report() -> Dict[str, Dict]:
+    """Calls, matched elements and time per selector ('index' counts builds and elements indexed)."""
+    return {
+        name: {
+            "calls": entry['calls'],
+            "hits": entry['hits'],
+            "total_ms": round(entry['seconds'] * 1000, 3),
+            "mean_us": round(entry['seconds'] / entry['calls'] * 1e6, 2) if entry['calls'] else None,
+        }
+        for name, entry in sorted(stats.items())
+    }
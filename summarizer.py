@@ -0,0 +1,114 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+from cachetools import LRUCache
+
+from text_chunking import SENTENCE_BREAK
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Blocks shorter than this (in words) get no summary
+SUMMARY_MIN_WORDS = int(os.environ.get('SUMMARY_MIN_WORDS', 250))
+SUMMARY_SENTENCES = int(os.environ.get('SUMMARY_SENTENCES', 3))
+# A summary over this fraction of the body's words isn't a summary (e.g. text without sentence punctuation)
+SUMMARY_MAX_RATIO = float(os.environ.get('SUMMARY_MAX_RATIO', 0.5))
+# Longer texts are ranked as runs of consecutive sentences, keeping the similarity matrix (and latency) bounded
+SUMMARY_MAX_UNITS = int(os.environ.get('SUMMARY_MAX_UNITS', 400))
+SUMMARY_CACHE_MAXSIZE = int(os.environ.get('SUMMARY_CACHE_MAXSIZE', 2000))
+
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+WORD = re.compile(r'\w+')
+# get_text(strip=True) joins paragraphs without a space: "...the end.Next paragraph"
+GLUED_SENTENCE_BREAK = re.compile(r'(?<=[a-z0-9][.!?])(?=[A-Z])')
+
+_cache = LRUCache(maxsize=SUMMARY_CACHE_MAXSIZE)
+_cache_lock = threading.Lock()
+_MISSING = object()
+stats = {"computed": 0, "cache_hits": 0, "skipped_short": 0, "skipped_not_shorter": 0}
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for piece in SENTENCE_BREAK.split(text):
+        sentences.extend(sentence.strip() for sentence in GLUED_SENTENCE_BREAK.split(piece) if sentence.strip())
+    return sentences
+
+def _group(sentences: List[str], max_units: int) -> List[str]:
+    size = -(-len(sentences) // max_units)
+    return [" ".join(sentences[i:i + size]) for i in range(0, len(sentences), size)]
+
+def _term_matrix(units: List[str]) -> sparse.csr_matrix:
+    """Row-normalized (units x vocabulary) word counts."""
+    vocabulary: Dict[str, int] = {}
+    rows, columns = [], []
+    for row, unit in enumerate(units):
+        for word in WORD.findall(unit.lower()):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(word, len(vocabulary)))
+    counts = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                               shape=(len(units), max(len(vocabulary), 1)))
+    norms = np.sqrt(counts.multiply(counts).sum(axis=1)).A1
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ counts
+
+def textrank(units: List[str]) -> np.ndarray:
+    """PageRank scores over the cosine-similarity graph of the units."""
+    vectors = _term_matrix(units)
+    similarity = (vectors @ vectors.T).toarray()
+    np.fill_diagonal(similarity, 0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    out_weight[out_weight == 0] = 1
+    transition = (similarity / out_weight).T
+
+    count = len(units)
+    scores = np.full(count, 1 / count)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / count + DAMPING * (transition @ scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+def summarize(text: str, sentences: int = SUMMARY_SENTENCES, min_words: int = SUMMARY_MIN_WORDS) -> Optional[str]:
+    """
+    Extractive summary: the top-ranked sentences, in their original order.
+    None for texts under min_words, and when the summary wouldn't be meaningfully
+    shorter than the text. Results are memoized by content hash.
+    """
+    key = hashlib.sha256(f"{sentences}\0{min_words}\0{text}".encode('utf-8')).hexdigest()
+    with _cache_lock:
+        cached = _cache.get(key, _MISSING)
+    if cached is not _MISSING:
+        stats['cache_hits'] += 1
+        return cached
+
+    words = len(text.split())
+    if words < min_words:
+        stats['skipped_short'] += 1
+        return None
+
+    units = split_sentences(text)
+    if len(units) > SUMMARY_MAX_UNITS:
+        units = _group(units, SUMMARY_MAX_UNITS)
+    summary = None
+    if len(units) > sentences:
+        top = np.sort(np.argsort(-textrank(units), kind='stable')[:sentences])
+        summary = " ".join(units[index] for index in top)
+        if len(summary.split()) > words * SUMMARY_MAX_RATIO:
+            summary = None
+    if summary is None:
+        stats['skipped_not_shorter'] += 1
+    else:
+        stats['computed'] += 1
+    with _cache_lock:
+        _cache[key] = summary
+    return summary
@@ -0,0 +1,68 @@
+import os
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+from celery import shared_task, group, chord
+
+from combined_processor import process_email, PROCESSOR_REGISTRY
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+PRIORITY_QUEUE = 'newsletters-priority'
+BULK_QUEUE = 'newsletters'
+
+# Newsletters that carry one article and parse quickly; they go ahead of large digests
+SINGLE_ARTICLE_PROCESSORS = {'seth_godin', 'simon_sinek', 'hbr_management_tip', 'dorie_clark', 'no_mercy_no_malice'}
+SMALL_EMAIL_BYTES = int(os.environ.get('SMALL_EMAIL_BYTES', 100 * 1024))
+
+def job_route(data: Dict) -> Tuple[str, int]:
+    """Pick (queue, priority) for an email; 0 is the highest priority with the Redis broker."""
+    metadata = data.get('metadata', {})
+    processor, _ = PROCESSOR_REGISTRY.resolve(metadata.get('sender', ''), metadata.get('Sender name', ''))
+    html_size = len(metadata.get('content', {}).get('html', ''))
+
+    if processor in SINGLE_ARTICLE_PROCESSORS or html_size <= SMALL_EMAIL_BYTES:
+        return PRIORITY_QUEUE, 0 if processor in SINGLE_ARTICLE_PROCESSORS else 3
+    return BULK_QUEUE, 6
+
+@shared_task(bind=True)
+def process_email_task(self, data: Dict, translate_to: Optional[str] = None) -> Dict:
+    result, status_code = process_email(data)
+
+    if translate_to and status_code == 200:
+        # Imported here to keep translation dependencies out of web worker startup
+        from translator import fanout_slices, translate_content_blocks_async, translate_newsletter_blocks
+        if self.request.is_eager:
+            # Eager mode can't wait on a chord; use the bounded thread pool instead
+            _, result['translation'] = translate_newsletter_blocks(result['content']['content_blocks'], translate_to)
+            return {"status": status_code, "result": result}
+
+        slices = fanout_slices(result['content']['content_blocks'])
+        if slices:
+            # Fan slices of blocks out to the workers, then reassemble them in order
+            header = group(translate_content_blocks_async.s(part, translate_to) for part in slices)
+            raise self.replace(chord(header, assemble_translation.s(result, time.time(), len(slices))))
+
+    return {"status": status_code, "result": result}
+
+@shared_task
+def assemble_translation(translated_slices, result: Dict, started_at: float, tasks: int) -> Dict:
+    blocks = [block for part in translated_slices for block in part]
+    result['content']['content_blocks'] = blocks
+    result['translation'] = {
+        "blocks": len(blocks),
+        "tasks": tasks,
+        "mode": "celery",
+        "seconds": round(time.time() - started_at, 4),
+    }
+    return {"status": 200, "result": result}
+
+def enqueue_process_email(data: Dict, translate_to: Optional[str] = None) -> str:
+    """Queue an email for background processing and return the job id."""
+    queue, priority = job_route(data)
+    async_result = process_email_task.apply_async(args=(data, translate_to), queue=queue, priority=priority)
+    logger.debug("Queued job %s on %s (priority %s)", async_result.id, queue, priority)
+    return async_result.id
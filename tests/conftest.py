@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+# Keep tests away from the shared dedup journal and the saved category model
+os.environ.setdefault('DEDUP_INDEX_PATH', '')
+os.environ.setdefault('CATEGORY_MODEL_PATH', '')
@@ -0,0 +1,29 @@
+"""The compiled AdMatcher flags exactly what the per-keyword scan it replaced flagged."""
+import pytest
+
+import newsletter_utils
+from benchmark import _ad_corpus, _legacy_is_advertisement
+from test_golden import FIXTURES_DIR
+
+# Editorial text full of words that are also ad keywords ("sales", "agenda", "conference")
+EDITORIAL_BLOCKS = [
+    {"title": "The Fed blinks", "body_text": (
+        "Retail sales fell for a second month, and wholesale prices barely moved. The agenda of the Fed "
+        "has shifted from inflation to employment, and the conference call with investors made that plain. "
+    ) * 6},
+    {"title": "Why most workshops fail", "body_text": (
+        "Most workshops fail because nobody is promoted for running them well. Join us in thinking about "
+        "why the agenda matters less than the room, and why a sale is a conversation, not a pitch. "
+    ) * 6},
+    {"title": "Wholesale changes", "body_text": "Sales teams at wholesalers reorganized around agendas."},
+]
+
+def test_matches_legacy_scan():
+    blocks = _ad_corpus(20, FIXTURES_DIR)
+    flagged = [newsletter_utils.is_advertisement(block) for block in blocks]
+    assert flagged == [_legacy_is_advertisement(block) for block in blocks]
+    assert any(flagged) and not all(flagged)
+
+@pytest.mark.parametrize('block', EDITORIAL_BLOCKS, ids=[block['title'] for block in EDITORIAL_BLOCKS])
+def test_editorial_blocks_are_kept(block):
+    assert not newsletter_utils.is_advertisement(block)
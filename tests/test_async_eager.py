@@ -0,0 +1,26 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app reads the Celery settings at import, so each configuration runs in a fresh interpreter
+EAGER_JOB = """
+import json
+from app import app
+email = json.load(open('fixtures/seth_godin_block_in_paragraph.json'))
+client = app.test_client()
+queued = client.post('/process_email?async=1', json=email)
+assert queued.status_code == 202, queued.get_data(as_text=True)
+job = client.get(queued.get_json()['status_url']).get_json()
+print(json.dumps([job['state'], job['status']]))
+"""
+
+def test_eager_jobs_run_without_redis():
+    env = {**os.environ, 'CELERY_TASK_ALWAYS_EAGER': '1', 'CELERY_BROKER_URL': 'redis://127.0.0.1:1',
+           'LOG_LEVEL': 'WARNING', 'DEDUP_INDEX_PATH': '', 'WARM_UP': '0'}
+    env.pop('CELERY_RESULT_BACKEND', None)
+    completed = subprocess.run([sys.executable, '-c', EAGER_JOB], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    assert json.loads(completed.stdout.strip().splitlines()[-1]) == ['SUCCESS', 200]
@@ -0,0 +1,44 @@
+import os
+
+import batch_processor
+from batch_processor import InvalidItem, parse_batch_body, process_batch
+
+def test_malformed_ndjson_line_fails_only_that_item():
+    items = parse_batch_body(b'{"metadata": {}}\n{not json\n[1]\n', 'application/x-ndjson')
+    assert isinstance(items[1], InvalidItem)
+
+    results = process_batch(items, max_workers=1)['results']
+    assert [result['status'] for result in results] == [400, 400, 400]
+    assert results[1]['result']['error'].startswith('Invalid JSON')
+    assert results[2]['result'] == {"error": "Invalid JSON structure"}
+
+def _crash_on_marker(data):
+    if data.get('crash'):
+        os._exit(1)
+    return {"n": data['n']}, 200
+
+def test_broken_pool_is_replaced_and_unfinished_items_fail(monkeypatch):
+    # Pool workers are forked, so they see the patched item function
+    monkeypatch.setattr(batch_processor, '_process_item', _crash_on_marker)
+    items = [{"n": 0}, {"n": 1}, {"crash": True}, {"n": 3}]
+    try:
+        results = process_batch(items, max_workers=2)['results']
+        assert results[2]['status'] == 500
+        assert all(result['status'] in (200, 500) for result in results)
+        assert batch_processor._executor is None
+
+        results = process_batch([{"n": 0}, {"n": 1}], max_workers=2)['results']
+        assert [result['status'] for result in results] == [200, 200]
+    finally:
+        if batch_processor._executor is not None:
+            batch_processor.reset_executor(batch_processor._executor)
+
+def test_reset_leaves_a_replacement_pool_alone():
+    stale = batch_processor.get_executor()
+    batch_processor.reset_executor(stale)
+    current = batch_processor.get_executor()
+    try:
+        batch_processor.reset_executor(stale)
+        assert batch_processor._executor is current
+    finally:
+        batch_processor.reset_executor(current)
@@ -0,0 +1,30 @@
+"""Batched categorization matches per-block results and drops ties it can't call."""
+import pytest
+
+from categorizer import get_category_model
+from combined_processor import process_email
+from sample_corpus import SOURCES, build_email
+
+@pytest.fixture(scope='module')
+def model():
+    return get_category_model()
+
+def test_batch_matches_one_text_at_a_time(model):
+    texts = []
+    for source in sorted(SOURCES):
+        result, _ = process_email(build_email(source, 10, seed=11))
+        texts.extend(f"{block.get('title', '')}\n{block.get('body_text', '')}" for block in result['content']['content_blocks'])
+    assert texts
+    assert model.categorize(texts) == [model.categorize([text])[0] for text in texts]
+
+def test_market_and_marketing_are_separate(model):
+    [categories] = model.categorize(["Stocks fell as bond yields rose and investors priced in another rate cut "
+                                     "from the central bank; equity markets and portfolio returns slipped."])
+    assert categories and not any('Marketing' in name for name in categories)
+
+def test_near_ties_are_dropped(model):
+    # Scores equal for every category: none beats the ones left out
+    assert model.categorize(["zzzz qqqq"], min_score=0.0) == [[]]
+
+def test_empty_batch(model):
+    assert model.categorize([]) == []
@@ -0,0 +1,49 @@
+
+from dedup_index import DedupIndex, FileStore
+
+def _block(story, link=None):
+    return {"title": f"Story {story}", "body_text": " ".join(f"word{story}x{i}" for i in range(20)),
+            "link": link if link is not None else f"https://example.com/{story}"}
+
+def _context(email_id, date_sent=''):
+    return {"email_id": email_id, "processor": 'test', "date_sent": date_sent}
+
+def test_link_keeps_matching_after_its_first_entry_expires():
+    index = DedupIndex()
+    link = 'https://example.com/shared'
+    assert index.check(_block(1, link), _context('a')) is None
+    # Same link, but a different story sent outside the window of the first: indexed as well
+    assert index.check(_block(2, link), _context('b', '2000-01-01T00:00:00Z')) is None
+    index._remove(index.by_link['//example.com/shared'][0])
+
+    first = index.check(_block(3, link), _context('c', '2000-01-02T00:00:00Z'))
+    assert first is not None and first['email_id'] == 'b'
+
+def test_blocks_without_email_id_are_not_indexed():
+    index = DedupIndex()
+    assert index.check(_block(1), _context('')) is None
+    assert index.check(_block(1), _context('')) is None
+    assert index.stats['skipped_no_id'] == 2
+    assert not index.entries
+
+def test_match_window_follows_the_send_date():
+    index = DedupIndex(window_seconds=3 * 86400)
+    index.check(_block(1), _context('a', '2026-10-16T08:00:00Z'))
+    assert index.check(_block(1), _context('b', 'Sat, 17 Oct 2026 08:00:00 +0000'))['email_id'] == 'a'
+    assert index.check(_block(1), _context('c', '2026-01-01T08:00:00Z')) is None
+
+def test_compaction_keeps_other_workers_appends(tmp_path):
+    path = str(tmp_path / 'index.jsonl')
+    FileStore(path).append({"key": "old", "email_id": "old", "source": "", "title": "", "link": "//old",
+                            "fingerprint": None, "seen_at": 0, "added_at": 0})
+    compacting = DedupIndex(FileStore(path), sync_seconds=0)
+    other = DedupIndex(FileStore(path), sync_seconds=3600)
+
+    compacting.check(_block(1), _context('a'))
+    other.check(_block(2), _context('b'))
+    compacting.compact()
+
+    with open(path) as f:
+        assert len(f.readlines()) == 2
+    assert any(entry['email_id'] == 'b' for entry in compacting.entries.values())
+    assert compacting.check(_block(2), _context('c'))['email_id'] == 'b'
@@ -0,0 +1,57 @@
+"""Parse regions, parser backends and noise stripping give the same output as a full html.parser parse."""
+import time
+
+import pytest
+
+import html_parsing
+from combined_processor import process_email
+from sample_corpus import SOURCES, build_email
+from test_golden import FIXTURES, _load
+
+EMAILS = {**{source: build_email(source, 20) for source in SOURCES}, **{name: _load(name) for name in FIXTURES}}
+
+def _comparable(email):
+    """The response without its per-run timing stats."""
+    result, status_code = process_email(email)
+    return {key: value for key, value in result.items() if key != 'pipeline'}, status_code
+
+@pytest.fixture(autouse=True)
+def uncached():
+    from combined_processor import RESULT_CACHE
+    enabled = RESULT_CACHE.enabled
+    RESULT_CACHE.enabled = False
+    yield
+    RESULT_CACHE.enabled = enabled
+
+@pytest.mark.parametrize('name', sorted(EMAILS))
+def test_partial_parse_matches_full_parse(name, monkeypatch):
+    monkeypatch.setattr(html_parsing, 'PARTIAL_PARSING', False)
+    full = _comparable(EMAILS[name])
+    monkeypatch.setattr(html_parsing, 'PARTIAL_PARSING', True)
+    assert _comparable(EMAILS[name]) == full
+
+@pytest.mark.parametrize('source', sorted(SOURCES))
+def test_lxml_matches_html_parser(source, monkeypatch):
+    pytest.importorskip('lxml')
+    email = EMAILS[source]
+    monkeypatch.setattr(html_parsing, 'PARSER_BACKEND', 'html.parser')
+    reference = _comparable(email)
+    monkeypatch.setattr(html_parsing, 'PARSER_BACKEND', 'lxml')
+    assert _comparable(email) == reference
+
+@pytest.mark.parametrize('html, expected', [
+    ('<p>a</p><script>var x = "<p>";</script><p>b</p>', '<p>a</p><p>b</p>'),
+    ('<p>a</p><!-- <p>hidden</p> --><STYLE type="text/css">p {}</STYLE ><p>b</p>', '<p>a</p><p>b</p>'),
+    ('<p>a</p><noscript><img src="x"></noscript><script>unclosed', '<p>a</p><script>unclosed'),
+    ('<p>a</p><!-- unclosed <script>x</script>', '<p>a</p><!-- unclosed <script>x</script>'),
+    ('<img src="pixel.gif" width="1" height="1"><img src="photo.jpg" width="600">', '<img src="photo.jpg" width="600">'),
+])
+def test_strip_noise(html, expected):
+    assert html_parsing.strip_noise(html) == expected
+
+@pytest.mark.parametrize('opening', ['<script>', '<style>', '<!--', '<img src="x" width="1"'])
+def test_strip_noise_is_linear_on_unclosed_elements(opening):
+    html = (opening + 'x' * 250) * 4000
+    start = time.perf_counter()
+    html_parsing.strip_noise(html)
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,31 @@
+"""json_codec gives the same documents as the stdlib encoding jsonify used before it."""
+import datetime
+import json
+import uuid
+
+import pytest
+
+import json_codec
+from combined_processor import process_email
+from sample_corpus import build_email
+
+@pytest.mark.parametrize('source', ['adweek', 'creative_bloq', 'generic'])
+def test_response_roundtrip_matches_stdlib(source):
+    result, _ = process_email(build_email(source, 50, seed=5))
+    stdlib_body = json.dumps(result, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    assert json.loads(json_codec.dumps(result, sort_keys=True)) == json.loads(stdlib_body)
+    assert json_codec.loads(stdlib_body) == json.loads(stdlib_body)
+
+def test_sort_keys():
+    assert json_codec.dumps({"b": 1, "a": {"d": 2, "c": 3}}, sort_keys=True) == b'{"a":{"c":3,"d":2},"b":1}'
+
+def test_lone_surrogates_fall_back_to_stdlib():
+    assert json_codec.loads(b'{"title": "broken \\ud83d emoji"}') == {"title": "broken \ud83d emoji"}
+    assert json.loads(json_codec.dumps({"title": "broken \ud83d emoji"})) == {"title": "broken \ud83d emoji"}
+
+def test_big_integers_fall_back_to_stdlib():
+    assert json_codec.loads(json_codec.dumps({"id": 2 ** 70})) == {"id": 2 ** 70}
+
+def test_dates_and_uuids():
+    value = {"date": datetime.date(2026, 10, 17), "id": uuid.UUID(int=1)}
+    assert json_codec.loads(json_codec.dumps(value)) == {"date": "2026-10-17", "id": str(uuid.UUID(int=1))}
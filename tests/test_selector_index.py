@@ -0,0 +1,24 @@
+"""Declared selectors find the same elements as the lambda find()s they replaced, and survive restyled templates."""
+import pytest
+from bs4 import BeautifulSoup
+
+from benchmark import LEGACY_SELECTOR_LOOKUPS, _reformat_styles, _selector_lookup
+from sample_corpus import build_email
+
+@pytest.mark.parametrize('backend', ['html.parser', 'lxml'])
+@pytest.mark.parametrize('source', sorted(LEGACY_SELECTOR_LOOKUPS))
+def test_finds_the_same_elements(source, backend):
+    if backend == 'lxml':
+        pytest.importorskip('lxml')
+    soup = BeautifulSoup(build_email(source, 20)['metadata']['content']['html'], backend)
+    legacy = LEGACY_SELECTOR_LOOKUPS[source](soup)
+    found = _selector_lookup(source, soup)
+    assert all(tag is not None for tag in legacy)
+    assert [id(tag) for tag in found] == [id(tag) for tag in legacy]
+
+@pytest.mark.parametrize('source', sorted(LEGACY_SELECTOR_LOOKUPS))
+def test_matches_survive_reformatted_styles(source):
+    html = build_email(source, 20)['metadata']['content']['html']
+    expected = len(_selector_lookup(source, BeautifulSoup(html, 'html.parser')))
+    found = _selector_lookup(source, BeautifulSoup(_reformat_styles(html), 'html.parser'))
+    assert len(found) == expected and all(tag is not None for tag in found)
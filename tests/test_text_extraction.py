@@ -0,0 +1,51 @@
+"""Single-pass text extraction gives the same text as the find_all/get_text code it replaced."""
+import pytest
+from bs4 import BeautifulSoup
+
+import text_extraction
+from benchmark import LEGACY_TEXT_EXTRACTORS, _single_pass_dorie_clark_text, _single_pass_no_mercy_no_malice_text
+from sample_corpus import build_email
+
+SINGLE_PASS_EXTRACTORS = {
+    'axios': lambda soup: ["\n\n".join(item.text for item in text_extraction.iter_text_items(section))
+                           for section in soup.find_all('td', class_='post-text')],
+    'no_mercy_no_malice': _single_pass_no_mercy_no_malice_text,
+    'seth_godin': lambda soup: ["\n\n".join(
+        item.text for item in text_extraction.iter_text_items(soup.find('div', class_='rssDesc')) if item.text)],
+    'hbr_management_tip': lambda soup: ["\n\n".join(item.text for item in text_extraction.iter_text_items(
+        soup.find('div', style=lambda s: s and 'font-family:Georgia' in s)))],
+    'dorie_clark': _single_pass_dorie_clark_text,
+}
+
+@pytest.mark.parametrize('backend', ['html.parser', 'lxml'])
+@pytest.mark.parametrize('source', sorted(LEGACY_TEXT_EXTRACTORS))
+def test_matches_legacy_extraction(source, backend):
+    if backend == 'lxml':
+        pytest.importorskip('lxml')
+    soup = BeautifulSoup(build_email(source, 50)['metadata']['content']['html'], backend)
+    assert SINGLE_PASS_EXTRACTORS[source](soup) == LEGACY_TEXT_EXTRACTORS[source](soup)
+
+@pytest.mark.parametrize('html', [
+    # Nested paragraphs: find_all returns the outer one and then the inner one
+    '<div class="rssDesc"><p>Outer <p>inner</p> tail</p><p>Next</p></div>',
+    '<div class="rssDesc"><ul><li><p>In a list</p></li></ul><p></p><p>After</p></div>',
+    '<div class="rssDesc"><blockquote><p>Quoted</p></blockquote><p>P.S. Reply to this email</p></div>',
+])
+def test_nested_paragraphs_match_legacy(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    assert SINGLE_PASS_EXTRACTORS['seth_godin'](soup) == LEGACY_TEXT_EXTRACTORS['seth_godin'](soup)
+
+@pytest.mark.parametrize('html', [
+    '<div class="message-content"><p>Intro</p><ul><li>One<ul><li>Nested</li></ul></li><li>Two</li></ul>'
+    '<p>***</p><p>Sponsor</p><p>***</p><h2>Heading</h2><p>PS - Thanks</p><p>Footer</p></div>',
+    '<div class="message-content"><p>Lead <ol><li>Inside a paragraph</li></ol></p><p>***</p><p>Ad copy</p></div>',
+])
+def test_dorie_clark_lists_and_ads_match_legacy(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    assert _single_pass_dorie_clark_text(soup) == LEGACY_TEXT_EXTRACTORS['dorie_clark'](soup)
+
+def test_no_mercy_no_malice_postscripts_match_legacy():
+    html = ('<table><tr id="content-blocks"><td class="dd"><p>Essay</p></td>'
+            '<td class="dd"><p>More</p>\n<p>P.S. Buy the book</p></td><td class="dd">\nP.P.S. Also this</td></tr></table>')
+    soup = BeautifulSoup(html, 'html.parser')
+    assert _single_pass_no_mercy_no_malice_text(soup) == LEGACY_TEXT_EXTRACTORS['no_mercy_no_malice'](soup)
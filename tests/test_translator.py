@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from prometheus_client import REGISTRY
+
+import translator
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setenv('GOOGLE_TRANSLATE_API_KEY', 'test')
+    monkeypatch.setattr(translator, 'get_translation_cache', lambda: _NoCache())
+    return monkeypatch
+
+class _NoCache:
+    def get(self, chunk, target_language):
+        return None
+
+    def set(self, chunk, target_language, translated):
+        pass
+
+def _sent(event):
+    return REGISTRY.get_sample_value('newsletter_translation_events_total', {'event': event}) or 0.0
+
+def test_failed_request_marks_blocks_as_fallback(api):
+    def fail(segments, target_language):
+        raise RuntimeError("API down")
+    api.setattr(translator, '_translate_segments', fail)
+
+    blocks = translator.translate_content_blocks([{"title": "Hello", "body_text": "World."}], 'he', fields=('title', 'body_text'))
+    assert blocks[0]['translation_fallback'] is True
+    assert blocks[0]['translated_title'] == 'Hello'
+
+def test_counters_are_exact_across_fanout_threads(api):
+    api.setattr(translator, '_post_segments', lambda segments, target_language: _Response(segments))
+    before_stats, before_metric = translator.translation_report()['segments'], _sent('segments')
+
+    texts = [[f"text {thread} {i}" for i in range(50)] for thread in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda batch: [translator._translate_segments([text], 'he') for text in batch], texts))
+
+    assert translator.translation_report()['segments'] - before_stats == 400
+    assert _sent('segments') - before_metric == 400
+
+class _Response:
+    def __init__(self, segments):
+        self.segments = segments
+
+    def json(self):
+        return {"data": {"translations": [{"translatedText": segment.upper()} for segment in self.segments]}}
@@ -0,0 +1,78 @@
+import re
+from typing import Iterator, Tuple
+
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])["\'”’)]*\s+')
+WORD_BREAK = re.compile(r'\s+')
+HTML_ENTITY_TAIL = re.compile(r'&#?\w{0,10}$')
+
+def _byte_length(text: str) -> int:
+    return len(text.encode('utf-8'))
+
+def _units(text: str, separator: str, pattern: re.Pattern) -> Iterator[Tuple[str, str]]:
+    """Split text at pattern matches into (piece, separator) pairs; the last piece keeps the outer separator."""
+    position = 0
+    for match in pattern.finditer(text):
+        if match.start() == 0:
+            continue
+        yield text[position:match.start()], match.group()
+        position = match.end()
+    yield text[position:], separator
+
+def _hard_split(text: str, separator: str, max_bytes: int) -> Iterator[Tuple[str, str]]:
+    """Last resort for a single over-long word: cut by bytes, never inside a character or an HTML entity."""
+    while _byte_length(text) > max_bytes:
+        cut = max(len(text.encode('utf-8')[:max_bytes].decode('utf-8', errors='ignore')), 1)
+        entity = HTML_ENTITY_TAIL.search(text[:cut])
+        if entity and entity.start() > 0:
+            cut = entity.start()
+        yield text[:cut], ''
+        text = text[cut:]
+    yield text, separator
+
+def _split(text: str, separator: str, max_bytes: int, levels) -> Iterator[Tuple[str, str]]:
+    if _byte_length(text) <= max_bytes:
+        yield text, separator
+        return
+    if not levels:
+        yield from _hard_split(text, separator, max_bytes)
+        return
+
+    # Greedily pack the finer units back together up to the limit
+    chunk, chunk_separator, chunk_bytes = None, '', 0
+    for piece, piece_separator in _units(text, separator, levels[0]):
+        piece_bytes = _byte_length(piece)
+        if piece_bytes > max_bytes:
+            if chunk is not None:
+                yield chunk, chunk_separator
+                chunk = None
+            yield from _split(piece, piece_separator, max_bytes, levels[1:])
+            continue
+
+        if chunk is None:
+            chunk, chunk_bytes = piece, piece_bytes
+        else:
+            joined_bytes = chunk_bytes + _byte_length(chunk_separator) + piece_bytes
+            if joined_bytes > max_bytes:
+                yield chunk, chunk_separator
+                chunk, chunk_bytes = piece, piece_bytes
+            else:
+                chunk, chunk_bytes = chunk + chunk_separator + piece, joined_bytes
+        chunk_separator = piece_separator
+
+    if chunk is not None:
+        yield chunk, chunk_separator
+
+def iter_chunks(text: str, max_bytes: int = 5000) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily split text into (chunk, separator) pairs of at most max_bytes UTF-8 bytes each,
+    so that ''.join(chunk + separator) reproduces the input exactly.
+
+    Every paragraph starts a new chunk, and only paragraphs over the limit are split further
+    (at sentence ends, then whitespace). An edit therefore only changes the chunks of the
+    paragraph it touches, and the rest keep hitting the translation cache.
+    """
+    levels = (SENTENCE_BREAK, WORD_BREAK)
+    for paragraph, separator in _units(text, '', PARAGRAPH_BREAK):
+        if paragraph or separator:
+            yield from _split(paragraph, separator, max_bytes, levels)
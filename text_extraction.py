@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+from bs4 import CData, NavigableString, PageElement, Tag
+
+# The strings get_text() returns: no comments, doctypes, or script/style contents
+TEXT_TYPES = (NavigableString, CData)
+LIST_TAGS = ('ul', 'ol')
+
+class TextItem(NamedTuple):
+    tag: str
+    text: str
+    # For ul/ol: the text of each li, in the order find_all('li') lists them
+    list_items: List[str]
+
+def iter_strings(root: Tag, strip: bool = True) -> Iterator[str]:
+    """The strings of root's subtree, as get_text(strip=...) joins them."""
+    for node in root.descendants:
+        if type(node) in TEXT_TYPES:
+            if not strip:
+                yield node
+                continue
+            piece = node.strip()
+            if piece:
+                yield piece
+
+def element_text(root: Optional[Tag], strip: bool = True) -> str:
+    """get_text(strip=True) (or .text with strip=False); '' when root is None."""
+    return "".join(iter_strings(root, strip)) if root is not None else ""
+
+def _end_of(tag: Tag, root: Tag) -> Optional[PageElement]:
+    """The first node after tag's subtree in document order, or None if the subtree runs to root's end."""
+    while tag is not root:
+        if tag.next_sibling is not None:
+            return tag.next_sibling
+        tag = tag.parent
+    return None
+
+def iter_text_items(root: Tag, item_tags: Sequence[str] = ('p',)) -> Iterator[TextItem]:
+    """
+    What [(e.name, e.get_text(strip=True)) for e in root.find_all(item_tags)] gives, from one
+    walk of root: every matching element in document order, nested ones included (a <p>
+    inside a <p> is yielded within its parent's text and again on its own). A ul/ol item
+    also carries the text of each li it contains, as find_all('li') lists them.
+
+    An item is yielded once it and every item that started before it are complete, and the
+    walk goes no further than that, so breaking out of the loop early skips the rest of root.
+    """
+    pending: Deque[list] = deque()  # [tag, pieces, list_items, complete] in document order
+    open_nodes: List[tuple] = []  # (end, pieces, is_item_entry) for open items and li, innermost last
+    open_lists: List[list] = []  # entries of open ul/ol items, which collect every li inside them
+
+    def close(node):
+        while open_nodes and open_nodes[-1][0] is node:
+            _, _, entry = open_nodes.pop()
+            if entry is not None:
+                entry[3] = True
+                if entry[0] in LIST_TAGS:
+                    open_lists.remove(entry)
+
+    for node in root.descendants:
+        close(node)
+        while pending and pending[0][3]:
+            tag, pieces, list_items, _ = pending.popleft()
+            yield TextItem(tag, "".join(pieces), ["".join(li) for li in list_items])
+
+        node_type = type(node)
+        if node_type in TEXT_TYPES:
+            if open_nodes:
+                piece = node.strip()
+                if piece:
+                    for _, pieces, _ in open_nodes:
+                        pieces.append(piece)
+        elif node_type is Tag:
+            if node.name == 'li' and open_lists:
+                li_pieces = []
+                for entry in open_lists:
+                    entry[2].append(li_pieces)
+                open_nodes.append((_end_of(node, root), li_pieces, None))
+            if node.name in item_tags:
+                entry = [node.name, [], [], False]
+                pending.append(entry)
+                open_nodes.append((_end_of(node, root), entry[1], entry))
+                if node.name in LIST_TAGS:
+                    open_lists.append(entry)
+
+    for tag, pieces, list_items, _ in pending:
+        yield TextItem(tag, "".join(pieces), ["".join(li) for li in list_items])
+
+def joined_text(elements: Iterable[Tag], separator: str = "\n\n") -> str:
+    """separator.join(e.get_text(strip=True) for e in elements)."""
+    return separator.join(element_text(element) for element in elements)
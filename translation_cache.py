@@ -0,0 +1,154 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from cachetools import LRUCache
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CACHE_MAXSIZE = int(os.environ.get('TRANSLATION_CACHE_MAXSIZE', 5000))
+TRANSLATION_CACHE_TTL = int(os.environ.get('TRANSLATION_CACHE_TTL', 30 * 86400))
+# Shared tier: Redis when a URL is set, otherwise a SQLite file shared by the workers on this host
+TRANSLATION_CACHE_REDIS_URL = os.environ.get('TRANSLATION_CACHE_REDIS_URL', '')
+TRANSLATION_CACHE_PATH = os.environ.get(
+    'TRANSLATION_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'newsletter_translation_cache.sqlite3'))
+
+def translation_key(text: str, target_language: str) -> str:
+    digest = hashlib.sha256(f"{target_language}\0{text}".encode('utf-8')).hexdigest()
+    return f"translation:{target_language}:{digest}"
+
+class SQLiteStore:
+    """Translation store in a local SQLite file (WAL mode, so several workers can share it)."""
+
+    def __init__(self, path: str, ttl: int):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+        self._connection.commit()
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT value FROM translations WHERE key = ? AND expires_at > ?', (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO translations (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, value, time.time() + self.ttl))
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._connection.execute('DELETE FROM translations WHERE expires_at <= ?', (time.time(),))
+            self._connection.commit()
+
+class RedisStore:
+    def __init__(self, url: str, ttl: int):
+        import redis
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key: str, value: str):
+        self._client.setex(key, self.ttl, value)
+
+class TranslationCache:
+    """
+    Chunk-level translation cache: an in-process LRU in front of a shared store.
+    Keys are a digest of the full chunk text and target language.
+    Tracks hit ratio and characters that didn't need to be sent to the API.
+    """
+
+    def __init__(self, store=None, maxsize: int = TRANSLATION_CACHE_MAXSIZE):
+        self.local = LRUCache(maxsize=maxsize)
+        self.store = store
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "store_hits": 0, "misses": 0, "store_errors": 0,
+                      "characters_saved": 0, "characters_translated": 0}
+
+    def get(self, text: str, target_language: str) -> Optional[str]:
+        key = translation_key(text, target_language)
+        with self._lock:
+            value = self.local.get(key)
+            if value is not None:
+                self.stats['local_hits'] += 1
+                self.stats['characters_saved'] += len(text)
+                return value
+
+        value = None
+        if self.store is not None:
+            try:
+                value = self.store.get(key)
+            except Exception as e:
+                logger.warning(f"Translation cache store read failed: {e}")
+                self.stats['store_errors'] += 1
+
+        with self._lock:
+            if value is not None:
+                self.local[key] = value
+                self.stats['store_hits'] += 1
+                self.stats['characters_saved'] += len(text)
+            else:
+                self.stats['misses'] += 1
+        return value
+
+    def set(self, text: str, target_language: str, translated: str):
+        """Store a successful translation. Never call this with a fallback (untranslated) result."""
+        key = translation_key(text, target_language)
+        with self._lock:
+            self.local[key] = translated
+            self.stats['characters_translated'] += len(text)
+
+        if self.store is not None:
+            try:
+                self.store.set(key, translated)
+            except Exception as e:
+                logger.warning(f"Translation cache store write failed: {e}")
+                self.stats['store_errors'] += 1
+
+    def report(self) -> Dict:
+        hits = self.stats['local_hits'] + self.stats['store_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            "store": type(self.store).__name__ if self.store is not None else None,
+            "local_entries": len(self.local),
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
+
+_translation_cache: Optional[TranslationCache] = None
+_translation_cache_lock = threading.Lock()
+
+def get_translation_cache() -> TranslationCache:
+    """Return the process-wide translation cache, opening the shared store on first use."""
+    global _translation_cache
+    with _translation_cache_lock:
+        if _translation_cache is None:
+            _translation_cache = _create_translation_cache()
+    return _translation_cache
+
+def _create_translation_cache() -> TranslationCache:
+    store = None
+    try:
+        if TRANSLATION_CACHE_REDIS_URL:
+            store = RedisStore(TRANSLATION_CACHE_REDIS_URL, TRANSLATION_CACHE_TTL)
+        elif TRANSLATION_CACHE_PATH:
+            store = SQLiteStore(TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Translation cache store unavailable, using in-process cache only: {e}")
+    return TranslationCache(store)
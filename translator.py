@@ -1,57 +1,326 @@
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+from translation_cache import get_translation_cache
+from text_chunking import iter_chunks
+import metrics
 import logging
 from celery import shared_task
+from logging_config import configure_logging
 
-logging.basicConfig(level=logging.DEBUG)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Get the API key from environment variable
-api_key = os.environ.get('GOOGLE_TRANSLATE_API_KEY')
-if not api_key:
-    logger.error("GOOGLE_TRANSLATE_API_KEY environment variable is not set")
-    raise EnvironmentError("GOOGLE_TRANSLATE_API_KEY environment variable is not set")
+def get_api_key() -> str:
+    """Read the API key from the environment when a request is about to be sent."""
+    api_key = os.environ.get('GOOGLE_TRANSLATE_API_KEY')
+    if not api_key:
+        logger.error("GOOGLE_TRANSLATE_API_KEY environment variable is not set")
+        raise EnvironmentError("GOOGLE_TRANSLATE_API_KEY environment variable is not set")
+    return api_key
 
-logger.debug("API key retrieved successfully")
+TRANSLATE_URL = os.environ.get('GOOGLE_TRANSLATE_URL', "https://translation.googleapis.com/language/translate/v2")
+# v2 accepts up to 128 q values per request; keep the total text per request bounded too
+TRANSLATE_MAX_SEGMENTS = int(os.environ.get('TRANSLATE_MAX_SEGMENTS', 128))
+TRANSLATE_MAX_REQUEST_CHARS = int(os.environ.get('TRANSLATE_MAX_REQUEST_CHARS', 30000))
 
-# Initialize a cache with a time-to-live of 1 day and max size of 1000 items
-cache = TTLCache(maxsize=1000, ttl=86400)
+# Character quota of the translation API; requests wait for tokens instead of tripping 429s.
+# The quota is per API key but each process keeps its own bucket, so every process gets an
+# equal share: set TRANSLATE_QUOTA_PROCESSES to the number of processes that translate with
+# this key (gunicorn workers plus Celery worker processes across all services).
+TRANSLATE_QUOTA_CHARS_PER_MINUTE = int(os.environ.get('TRANSLATE_QUOTA_CHARS_PER_MINUTE', 6000000))
+TRANSLATE_QUOTA_PROCESSES = max(1, int(os.environ.get('TRANSLATE_QUOTA_PROCESSES', 1)))
+PROCESS_QUOTA_CHARS_PER_MINUTE = TRANSLATE_QUOTA_CHARS_PER_MINUTE / TRANSLATE_QUOTA_PROCESSES
+# Parallel translation requests per newsletter, and blocks handed to each worker
+TRANSLATION_CONCURRENCY = int(os.environ.get('TRANSLATION_CONCURRENCY', 4))
+TRANSLATION_FANOUT_BLOCKS = int(os.environ.get('TRANSLATION_FANOUT_BLOCKS', 4))
 
-def translate_text(text, target_language='he', chunk_size=5000):
+# Retry policy for 429/5xx and connection errors, and the circuit breaker that stops retrying during outages
+TRANSLATE_TIMEOUT = float(os.environ.get('TRANSLATE_TIMEOUT', 30))
+TRANSLATE_MAX_ATTEMPTS = int(os.environ.get('TRANSLATE_MAX_ATTEMPTS', 4))
+TRANSLATE_BACKOFF_MAX = float(os.environ.get('TRANSLATE_BACKOFF_MAX', 20))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('TRANSLATE_CIRCUIT_FAILURES', 5))
+CIRCUIT_RESET_SECONDS = float(os.environ.get('TRANSLATE_CIRCUIT_RESET_SECONDS', 60))
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Requests sent, segments translated, retries and fallbacks in this process (all processes on /metrics)
+TRANSLATION_STATS = {"requests": 0, "segments": 0, "characters": 0, "retries": 0,
+                     "failed_requests": 0, "fallback_segments": 0, "fallback_characters": 0}
+_stats_lock = threading.Lock()
+
+def _count(**amounts):
+    """Add to TRANSLATION_STATS and the matching Prometheus counters; called from the fan-out threads."""
+    with _stats_lock:
+        for event, amount in amounts.items():
+            TRANSLATION_STATS[event] += amount
+    for event, amount in amounts.items():
+        metrics.count_translation(event, amount)
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
     """
-    Translate text to the target language using Google Translate API.
-    Uses caching to avoid unnecessary API calls and chunks long texts.
+    Opens after `failure_threshold` consecutive failed requests and fails fast for
+    `reset_seconds`; then lets one trial request through (half-open) to probe recovery.
     """
-    if not text:  # Handle empty strings
-        return text
 
-    cache_key = f"{text[:100]}:{target_language}"  # Use first 100 chars for cache key
-    if cache_key in cache:
-        return cache[cache_key]
-    
-    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-    translated_chunks = []
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.state = 'closed'
+        self.opened_at = None
+        self.open_seconds_total = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError("Translation circuit is open")
+                self.state = 'half-open'
+            elif self.state == 'half-open':
+                self.rejected += 1
+                raise CircuitOpenError("Translation circuit is half-open, trial request in flight")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                self._close()
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                if self.state == 'half-open':
+                    self.open_seconds_total += time.monotonic() - self.opened_at
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                logger.warning(f"Translation circuit opened after {self.failures} failures")
+
+    def _close(self):
+        self.open_seconds_total += time.monotonic() - self.opened_at
+        self.state = 'closed'
+        self.opened_at = None
+        logger.info("Translation circuit closed")
+
+    def report(self):
+        with self._lock:
+            open_seconds = self.open_seconds_total
+            if self.opened_at is not None:
+                open_seconds += time.monotonic() - self.opened_at
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected_requests": self.rejected,
+                "open_seconds_total": round(open_seconds, 3),
+            }
+
+CIRCUIT_BREAKER = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at rate tokens/second up to capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float):
+        """Block until tokens are available. Requests larger than capacity wait for a full bucket."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+# This process's share of the quota, with a burst of up to ten seconds' worth
+RATE_LIMITER = TokenBucket(PROCESS_QUOTA_CHARS_PER_MINUTE / 60, PROCESS_QUOTA_CHARS_PER_MINUTE / 6)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session for the translation API."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+    return _session
+
+def _pack_requests(segments):
+    """Group segments into request-sized batches by segment count and total characters."""
+    batch, batch_chars = [], 0
+    for segment in segments:
+        if batch and (len(batch) >= TRANSLATE_MAX_SEGMENTS or batch_chars + len(segment) > TRANSLATE_MAX_REQUEST_CHARS):
+            yield batch
+            batch, batch_chars = [], 0
+        batch.append(segment)
+        batch_chars += len(segment)
+    if batch:
+        yield batch
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+class _BackoffWait:
+    """Exponential backoff with full jitter, honouring a numeric Retry-After on 429/503."""
+
+    def __init__(self):
+        self.jitter = wait_random_exponential(multiplier=0.5, max=TRANSLATE_BACKOFF_MAX)
+
+    def __call__(self, retry_state):
+        error = retry_state.outcome.exception()
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), TRANSLATE_BACKOFF_MAX)
+        return self.jitter(retry_state)
+
+def _count_retry(retry_state):
+    _count(retries=1)
+    logger.warning(f"Retrying translation request (attempt {retry_state.attempt_number}): {retry_state.outcome.exception()}")
+
+def _post_segments(segments, target_language):
+    RATE_LIMITER.acquire(sum(len(segment) for segment in segments))
+    response = get_session().post(
+        TRANSLATE_URL,
+        params={'key': get_api_key()},
+        data={'q': segments, 'target': target_language},
+        timeout=TRANSLATE_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response
+
+def _translate_segments(segments, target_language):
+    """
+    Send one v2 request carrying several q values; returns translations in order.
+    Retries 429/5xx and connection errors with jittered backoff, and fails fast
+    with CircuitOpenError while the circuit breaker is open.
+    """
+    CIRCUIT_BREAKER.before_request()
+    try:
+        response = Retrying(
+            retry=retry_if_exception(_is_retryable),
+            stop=stop_after_attempt(TRANSLATE_MAX_ATTEMPTS),
+            wait=_BackoffWait(),
+            before_sleep=_count_retry,
+            reraise=True,
+        )(_post_segments, segments, target_language)
+    except Exception:
+        _count(failed_requests=1)
+        CIRCUIT_BREAKER.record_failure()
+        raise
 
+    CIRCUIT_BREAKER.record_success()
+    _count(requests=1, segments=len(segments), characters=sum(len(segment) for segment in segments))
+    return [translation['translatedText'] for translation in response.json()['data']['translations']]
+
+def translation_report():
+    with _stats_lock:
+        stats = dict(TRANSLATION_STATS)
+    return {**stats, "quota_chars_per_minute": PROCESS_QUOTA_CHARS_PER_MINUTE,
+            "circuit": CIRCUIT_BREAKER.report()}
+
+def _translate_chunks(chunks, target_language):
+    """Map each distinct chunk to its translation, using the cache and batched requests for the rest."""
+    cache = get_translation_cache()
+    translations = {}
+    pending = []
     for chunk in chunks:
+        if chunk in translations:
+            continue
+        if not chunk.strip():
+            translations[chunk] = chunk
+            continue
+        cached = cache.get(chunk, target_language)
+        translations[chunk] = cached
+        if cached is None:
+            pending.append(chunk)
+
+    if pending:
+        get_api_key()  # A missing key is a configuration error, not a translation fallback
+
+    for batch in _pack_requests(pending):
         try:
-            url = "https://translation.googleapis.com/language/translate/v2"
-            params = {
-                'q': chunk,
-                'target': target_language,
-                'key': api_key
-            }
-            response = requests.post(url, params=params)
-            response.raise_for_status()
-            result = response.json()
-            translated_chunks.append(result['data']['translations'][0]['translatedText'])
+            for chunk, translated_chunk in zip(batch, _translate_segments(batch, target_language)):
+                cache.set(chunk, target_language, translated_chunk)
+                translations[chunk] = translated_chunk
         except Exception as e:
+            # Fallback: the original text is used for this response but never cached
             logger.error(f"Translation error: {str(e)}")
-            translated_chunks.append(chunk)  # Use original text if translation fails
+            _count(fallback_segments=len(batch), fallback_characters=sum(len(chunk) for chunk in batch))
+
+    return translations
+
+def _join(pieces, translations):
+    # Use original text if translation fails (not cached); original separators are kept
+    return ''.join((translations.get(chunk) or chunk) + separator for chunk, separator in pieces)
+
+def _fell_back(pieces, translations):
+    """True if any chunk of the text kept its original wording because its request failed."""
+    return any(translations.get(chunk) is None for chunk, _ in pieces)
+
+def _translate_texts(texts, target_language, chunk_size):
+    """translate_batch, plus whether each text fell back to the original for any chunk."""
+    text_pieces = [list(iter_chunks(text, chunk_size)) if text else [] for text in texts]
+    translations = _translate_chunks((chunk for pieces in text_pieces for chunk, _ in pieces), target_language)
+    translated = [_join(pieces, translations) if text else text for text, pieces in zip(texts, text_pieces)]
+    return translated, [_fell_back(pieces, translations) for pieces in text_pieces]
+
+def translate_batch(texts, target_language='he', chunk_size=5000):
+    """
+    Translate many texts with as few API requests as possible.
+    Texts are chunked at paragraph/sentence boundaries, cached chunks are skipped,
+    identical chunks are sent once, and the rest are packed into multi-segment requests.
+    Returns texts in input order.
+    """
+    return _translate_texts(texts, target_language, chunk_size)[0]
+
+def translate_text(text, target_language='he', chunk_size=5000):
+    """
+    Translate text to the target language using Google Translate API.
+    The text is streamed through the chunker a window of chunks at a time, so very long
+    inputs never hold their full chunk list. Each chunk is cached under a digest of its
+    full content, so unchanged paragraphs are only sent to the API once.
+    """
+    if not text:  # Handle empty strings
+        return text
 
-    translated_text = ' '.join(translated_chunks)
-    cache[cache_key] = translated_text
-    return translated_text
+    translated_parts = []
+    window = []
+    for piece in iter_chunks(text, chunk_size):
+        window.append(piece)
+        if len(window) >= TRANSLATE_MAX_SEGMENTS:
+            translated_parts.append(_join(window, _translate_chunks((chunk for chunk, _ in window), target_language)))
+            window = []
+    if window:
+        translated_parts.append(_join(window, _translate_chunks((chunk for chunk, _ in window), target_language)))
+    return ''.join(translated_parts)
 
 def translate_long_text(text, target_language='he', max_length=5000):
     """
@@ -59,18 +328,62 @@ def translate_long_text(text, target_language='he', max_length=5000):
     """
     return translate_text(text, target_language, max_length)
 
-def translate_content_block(block, target_language='he'):
+def translate_content_blocks(blocks, target_language='he', fields=('text', 'description', 'enrichment_text')):
+    """
+    Translate the given fields across many content blocks in batched requests,
+    storing each result under 'translated_<field>'. Blocks with a field left in the
+    original language because a request failed are marked translation_fallback.
+    """
+    targets = [(block, field) for block in blocks for field in fields if field in block and block[field]]
+    logger.info("Translating %d fields across %d blocks", len(targets), len(blocks))
+    translated, fell_back = _translate_texts([block[field] for block, field in targets], target_language, 5000)
+    for (block, field), text, fallback in zip(targets, translated, fell_back):
+        block[f'translated_{field}'] = text
+        if fallback:
+            block['translation_fallback'] = True
+    return blocks
+
+def fanout_slices(blocks, size=None):
+    """Split blocks into consecutive slices, each translated by one worker."""
+    size = max(1, size or TRANSLATION_FANOUT_BLOCKS)
+    return [blocks[i:i+size] for i in range(0, len(blocks), size)]
+
+def translate_newsletter_blocks(blocks, target_language='he', fields=('title', 'body_text'), max_workers=None):
     """
-    Translate the 'text', 'description', and 'enrichment_text' fields of a content block.
+    Translate a newsletter's blocks in parallel slices on a bounded thread pool.
+    Blocks are updated in place and keep their order. Returns (blocks, stats).
     """
-    for field in ['text', 'description', 'enrichment_text']:
-        if field in block and block[field]:
-            logger.info(f"Translating {field} (length: {len(block[field])})")
-            block[f'translated_{field}'] = translate_text(block[field], target_language)
-    return block
+    start = time.perf_counter()
+    workers = max_workers or TRANSLATION_CONCURRENCY
+    slices = fanout_slices(blocks)
+
+    if workers > 1 and len(slices) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(slices))) as executor:
+            list(executor.map(lambda part: translate_content_blocks(part, target_language, fields), slices))
+    else:
+        for part in slices:
+            translate_content_blocks(part, target_language, fields)
+
+    return blocks, {
+        "blocks": len(blocks),
+        "tasks": len(slices),
+        "concurrency": workers,
+        "mode": "threads",
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+def translate_content_block(block, target_language='he', fields=('text', 'description', 'enrichment_text')):
+    """
+    Translate the given fields of a content block (by default 'text', 'description', and 'enrichment_text').
+    """
+    return translate_content_blocks([block], target_language, fields)[0]
+
+@shared_task
+def translate_content_block_async(block, target_language='he', fields=('text', 'description', 'enrichment_text')):
+    return translate_content_block(block, target_language, fields)
 
 @shared_task
-def translate_content_block_async(block, target_language='he'):
-    return translate_content_block(block, target_language)
+def translate_content_blocks_async(blocks, target_language='he', fields=('title', 'body_text')):
+    return translate_content_blocks(blocks, target_language, fields)
 
-logger.debug("translator.py loaded successfully")
\ No newline at end of file
+logger.debug("translator.py loaded successfully")